@@ -12,8 +12,16 @@ from Qt import __version__
 from shiboken2 import wrapInstance
 
 import re
-import string
-from itertools import combinations_with_replacement as cwr
+
+from gvMayaUtils import gvRenamer
+from gvMayaUtils.gvCopySkin import copySkin, copySkinSteps, shapesQuery, skinClusterList, saveSkin, loadSkin
+from gvMayaUtils.gvSkinFile import EXTENSION as SKIN_EXTENSION
+from gvMayaUtils.gvColorOverride import OVERRIDE_OFF, color_values, override_steps
+from gvMayaUtils import gvColorPalette
+from gvMayaUtils.gvSelection import selection, selection_service
+from gvMayaUtils.gvRenamePlan import build_plan, plan_names, resolve_conflicts, letters_constructor, short_name
+from gvMayaUtils.gvNameTemplate import compile_template, node_context
+from gvMayaUtils.gvTaskRunner import Background, TaskRunner
 
 import logging
 
@@ -90,6 +98,199 @@ def getMayaMainWindow():
     # Finally we return this to whoever wants it
     return ptr
 
+class RenamePreviewModel(QAbstractTableModel):
+
+    """
+        ###  Preview do renamer: nome atual e novo nome de cada objeto  ###
+
+        Os novos nomes sao os do plano resolvido (resolve_conflicts), o mesmo
+        que o Rename aplica, calculado uma vez por template/selecao. As linhas
+        cujo nome pedido ja existe (na cena ou no proprio plano) ficam
+        destacadas. O model nunca renomeia nada.
+    """
+
+    headers = ('Nome atual', 'Novo nome')
+
+    def __init__(self, parent=None):
+        super(RenamePreviewModel, self).__init__(parent)
+        self.nodes = []
+        self.index = None
+        self.template = None
+        self.types = None
+        self.plan = None
+
+    def setNodes(self, nodes, index):
+        """
+            ###  Nova selecao (long names) e o NameIndex da cena  ###
+        """
+        self.beginResetModel()
+        self.nodes = nodes
+        self.index = index
+        self.types = None
+        self.plan = None
+        self.endResetModel()
+
+    def setTemplate(self, template):
+        """
+            ###  Novo template compilado, ou None para limpar o preview  ###
+        """
+        self.beginResetModel()
+        self.template = template
+        self.plan = None
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid() or self.template is None:
+            return 0
+        return len(self.nodes)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def resolvedPlan(self):
+        """
+            ###  long name -> (nome pedido, nome resolvido), calculado uma vez  ###
+        """
+        if self.plan is None:
+            contexts = None
+            if self.template.tokens:
+                types = self.nodeTypes() if 'type' in self.template.tokens else [''] * len(self.nodes)
+                contexts = [node_context(name, nodeType) for name, nodeType in zip(self.nodes, types)]
+
+            # os mesmos nomes do RENAMER e do Rename
+            wanted = build_plan(self.nodes, plan_names(self.template.pattern, len(self.nodes), contexts=contexts))
+            resolved = wanted if self.index is None else resolve_conflicts(wanted, self.index)[0]
+            wantedNames = wanted.mapping()
+            self.plan = dict((old, (wantedNames[old], new)) for old, new in resolved)
+        return self.plan
+
+    def row(self, row):
+        """
+            ###  (nome atual, novo nome, nome pedido) da linha  ###
+        """
+        longName = self.nodes[row]
+        wanted, new = self.resolvedPlan()[longName]
+        return short_name(longName), new, wanted
+
+    def nodeTypes(self):
+        # um unico ls para todos os objetos, so se o template usa {type}
+        if self.types is None:
+            self.types = (cmds.ls(self.nodes, showType=True) or [])[1::2]
+        return self.types
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        old, new, wanted = self.row(index.row())
+        if role == Qt.DisplayRole:
+            return new if index.column() else old
+        if role == Qt.BackgroundRole and new != wanted:
+            return QColor(150, 60, 60)
+        if role == Qt.ToolTipRole and new != wanted:
+            return "%s ja existe, vai receber %s" % (wanted, new)
+        return None
+
+
+class NodeListModel(QAbstractListModel):
+
+    """
+        ###  Lista de objetos (long names) do copy skin, com o icone do tipo de shape  ###
+
+        Os icones sao lidos do disco uma vez so e compartilhados por todas as
+        listas. Adicionar e remover objetos nao refaz a lista inteira.
+    """
+
+    # icone de cada tipo de shape aceito
+    iconFiles = {'mesh': 'geo_icon.png', 'nurbsSurface': 'surface_icon.png', 'nurbsCurve': 'curve_icon.png'}
+    icons = {}
+
+    def __init__(self, parent=None):
+        super(NodeListModel, self).__init__(parent)
+        self.nodes = []
+        self.types = []
+        self.present = set()
+
+    @classmethod
+    def icon(cls, nodeType):
+        """
+            ###  QIcon do tipo de shape, carregado uma vez so  ###
+        """
+        icon = cls.icons.get(nodeType)
+        if icon is None:
+            base_dir = os.path.dirname(__file__)+'/icons'
+            icon = cls.icons[nodeType] = QIcon(base_dir + '/' + cls.iconFiles[nodeType])
+        return icon
+
+    def setNodes(self, items):
+        """
+            ###  Troca a lista inteira por items, lista de (long name, tipo do shape)  ###
+        """
+        self.beginResetModel()
+        self.nodes = []
+        self.types = []
+        self.present = set()
+        self.endResetModel()
+        self.appendNodes(items)
+
+    def appendNodes(self, items):
+        """
+            ###  Adiciona de uma vez os (long name, tipo do shape) que ainda nao estao na lista  ###
+        """
+        new = []
+        seen = set(self.present)
+        for node, nodeType in items:
+            if node not in seen:
+                seen.add(node)
+                new.append((node, nodeType))
+        if not new:
+            return
+
+        first = len(self.nodes)
+        self.beginInsertRows(QModelIndex(), first, first + len(new) - 1)
+        for node, nodeType in new:
+            self.nodes.append(node)
+            self.types.append(nodeType)
+        self.present = seen
+        self.endInsertRows()
+
+    def removeNodes(self, rows):
+        """
+            ###  Remove as linhas, um bloco de linhas seguidas por vez  ###
+        """
+        rows = sorted(set(rows), reverse=True)
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for node in self.nodes[first:last + 1]:
+                self.present.discard(node)
+            del self.nodes[first:last + 1]
+            del self.types[first:last + 1]
+            self.endRemoveRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.nodes)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return self.nodes[row]
+        if role == Qt.DecorationRole:
+            return self.icon(self.types[row])
+        return None
+
+
 class RigToolsUI(QWidget):
 
     """
@@ -126,12 +327,22 @@ class RigToolsUI(QWidget):
         parent.setGeometry((screenWidth/2)-(winWidth/2), (screenHeight/2)-(winHeight/2), winWidth, winHeight)
 
         # lista de meshs para aplicar o skin
-        self.sourceMesh = []
-        self.targetMesh = []
+        self.sourceSkinModel = NodeListModel(self)
+        self.targetSkinModel = NodeListModel(self)
+
+        # presets de cores, lidos uma vez so
+        self.palettes = gvColorPalette.presets()
+
+        # operacoes longas rodam em fatias, sem travar o Maya
+        self.runner = TaskRunner(onProgress=self.taskProgress, onFinished=self.taskFinished)
+        self.taskDone = None
 
         # initialize
         self.initUI()
 
+        # renomeacoes interrompidas por um crash
+        self.recoverRenames()
+
         self.parent().layout().addWidget(self)
 
         if not dock:
@@ -154,6 +365,24 @@ class RigToolsUI(QWidget):
         layout.addWidget(groupColorPicker)
         layout.addWidget(groupCopySkin)
 
+        # as tools ficam desabilitadas enquanto uma operacao roda
+        self.toolGroups = [groupBox, groupColorPicker, groupCopySkin]
+
+        # progresso da operacao em andamento, com ETA e cancelar
+        self.taskWidget = QWidget()
+        taskLayout = QHBoxLayout(self.taskWidget)
+        taskLayout.setContentsMargins(0, 0, 0, 0)
+        self.taskLabel = QLabel()
+        self.taskProgressBar = QProgressBar()
+        self.taskCancelBtn = QPushButton('Cancel')
+        QWidget.setToolTip(self.taskCancelBtn, "Interrompe a operacao em andamento")
+        self.taskCancelBtn.clicked.connect(self.runner.cancel)
+        taskLayout.addWidget(self.taskLabel)
+        taskLayout.addWidget(self.taskProgressBar)
+        taskLayout.addWidget(self.taskCancelBtn)
+        self.taskWidget.hide()
+        layout.addWidget(self.taskWidget)
+
         # caixa de texto para renomear os objetos
         self.text_field_rename = QLineEdit()
         QWidget.setToolTipDuration(self.text_field_rename, 0.01)
@@ -166,9 +395,30 @@ class RigToolsUI(QWidget):
         rename_btn.clicked.connect(self.renameBtn)
 
         # Adicao do botao e da caixa de texto no groupBox
-        vbox_renamer_group_layout = QHBoxLayout()
-        vbox_renamer_group_layout.addWidget(self.text_field_rename)
-        vbox_renamer_group_layout.addWidget(rename_btn)
+        hbox_renamer_field_layout = QHBoxLayout()
+        hbox_renamer_field_layout.addWidget(self.text_field_rename)
+        hbox_renamer_field_layout.addWidget(rename_btn)
+
+        # preview dos novos nomes: o plano resolvido e calculado uma vez por template/selecao
+        self.renamePreviewModel = RenamePreviewModel(self)
+        self.renamePreview = QTableView()
+        self.renamePreview.setModel(self.renamePreviewModel)
+        self.renamePreview.verticalHeader().hide()
+        self.renamePreview.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.renamePreview.verticalHeader().setDefaultSectionSize(18)
+        self.renamePreview.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.renamePreview.setSelectionMode(QAbstractItemView.NoSelection)
+
+        # o preview so e atualizado quando o usuario para de digitar
+        self.renamePreviewTimer = QTimer(self)
+        self.renamePreviewTimer.setSingleShot(True)
+        self.renamePreviewTimer.setInterval(150)
+        self.renamePreviewTimer.timeout.connect(self.updateRenamePreview)
+        self.text_field_rename.textChanged.connect(self.renamePreviewTimer.start)
+
+        vbox_renamer_group_layout = QVBoxLayout()
+        vbox_renamer_group_layout.addLayout(hbox_renamer_field_layout)
+        vbox_renamer_group_layout.addWidget(self.renamePreview)
         groupBox.setLayout(vbox_renamer_group_layout)
 
         # Botoes de override color
@@ -179,9 +429,26 @@ class RigToolsUI(QWidget):
         QWidget.setToolTip(removeColorBtn, "Remove todos os override de cor")
         removeColorBtn.clicked.connect(self.removeOverride)
 
-        vbox_colorPicker_group_layout = QHBoxLayout()
-        vbox_colorPicker_group_layout.addWidget(colorBtn)
-        vbox_colorPicker_group_layout.addWidget(removeColorBtn)
+        # cores automaticas pelas regras de nome de um preset
+        self.paletteCombo = QComboBox()
+        self.paletteCombo.addItems(sorted(self.palettes))
+        if 'default' in self.palettes:
+            self.paletteCombo.setCurrentIndex(self.paletteCombo.findText('default'))
+        QWidget.setToolTip(self.paletteCombo, "Preset de cores (_L_, _R_, _C_ e nomes de controles)")
+        autoColorBtn = QPushButton('Auto Color')
+        QWidget.setToolTip(autoColorBtn, "Aplica o preset nos controles selecionados (e filhos), ou em toda a cena")
+        autoColorBtn.clicked.connect(self.autoColor)
+
+        hbox_colorPicker_buttons_layout = QHBoxLayout()
+        hbox_colorPicker_buttons_layout.addWidget(colorBtn)
+        hbox_colorPicker_buttons_layout.addWidget(removeColorBtn)
+        hbox_colorPicker_palette_layout = QHBoxLayout()
+        hbox_colorPicker_palette_layout.addWidget(self.paletteCombo)
+        hbox_colorPicker_palette_layout.addWidget(autoColorBtn)
+
+        vbox_colorPicker_group_layout = QVBoxLayout()
+        vbox_colorPicker_group_layout.addLayout(hbox_colorPicker_buttons_layout)
+        vbox_colorPicker_group_layout.addLayout(hbox_colorPicker_palette_layout)
         groupColorPicker.setLayout(vbox_colorPicker_group_layout)
 
         # lista de sources do copy skin
@@ -193,19 +460,11 @@ class RigToolsUI(QWidget):
 
         skinListLayout.addWidget(sourceSkinListWidget)
 
-        size = 30
-        self.sourceSkinList = QListWidget()
-        sourceSkinListLayout.addWidget(self.sourceSkinList)
-        # We set the icon size of this list
-        self.sourceSkinList.setIconSize(QSize(size, size))
-        # then we set it to adjust its position when we resize the window
-        self.sourceSkinList.setResizeMode(QListWidget.Adjust)
-        # Finally we set the grid size to be just a little larger than our icons to store our text label too
-        self.sourceSkinList.setGridSize(QSize(size+12, size+12))
+        self.sourceSkinList = self.nodeListView(self.sourceSkinModel, sourceSkinListLayout)
 
         self.sourceSkinBtn = QPushButton('Source Meshs')
         QWidget.setToolTip(self.sourceSkinBtn, "Selecione as meshs que voce gostaria de copiar o skin")
-        self.sourceSkinBtn.clicked.connect(partial(self.addItensList, self.sourceSkinList, self.sourceMesh))
+        self.sourceSkinBtn.clicked.connect(partial(self.addItensList, self.sourceSkinModel))
         sourceSkinListLayout.addWidget(self.sourceSkinBtn)
 
         # button para transferir o skin de uma lista para outra
@@ -224,39 +483,171 @@ class RigToolsUI(QWidget):
         targetSkinListLayout = QVBoxLayout(targetListWidget)
         skinListLayout.addWidget(targetListWidget)
 
-        self.targetList = QListWidget()
-        # We set the icon size of this list
-        self.targetList.setIconSize(QSize(size, size))
-        # then we set it to adjust its position when we resize the window
-        self.targetList.setResizeMode(QListWidget.Adjust)
-        # Finally we set the grid size to be just a little larger than our icons to store our text label too
-        self.targetList.setGridSize(QSize(size+12, size+12))
-        targetSkinListLayout.addWidget(self.targetList)
+        self.targetList = self.nodeListView(self.targetSkinModel, targetSkinListLayout)
 
         self.targetSkinBtn = QPushButton('Target Meshs')
         QWidget.setToolTip(self.targetSkinBtn, "Selecione as meshs que voce gostaria de colar o skin")
-        self.targetSkinBtn.clicked.connect(partial(self.addItensList, self.targetList, self.targetMesh))
+        self.targetSkinBtn.clicked.connect(partial(self.addItensList, self.targetSkinModel))
         targetSkinListLayout.addWidget(self.targetSkinBtn)
 
+        # salvar e carregar os pesos em arquivo
+
+        skinFileWidget = QWidget()
+        skinFileLayout = QHBoxLayout(skinFileWidget)
+
+        self.saveSkinBtn = QPushButton('Save Weights')
+        QWidget.setToolTip(self.saveSkinBtn, "Salva os pesos das meshs selecionadas em arquivo")
+        self.saveSkinBtn.clicked.connect(self.funcSaveSkinBtn)
+        skinFileLayout.addWidget(self.saveSkinBtn)
+
+        self.loadSkinBtn = QPushButton('Load Weights')
+        QWidget.setToolTip(self.loadSkinBtn, "Carrega os pesos salvos nas meshs selecionadas")
+        self.loadSkinBtn.clicked.connect(self.funcLoadSkinBtn)
+        skinFileLayout.addWidget(self.loadSkinBtn)
+
         vbox_CopySkin_group_layout = QVBoxLayout()
         vbox_CopySkin_group_layout.addWidget(skinListWidget)
+        vbox_CopySkin_group_layout.addWidget(skinFileWidget)
         groupCopySkin.setLayout(vbox_CopySkin_group_layout)
 
 
+    def runTask(self, name, task, onDone=None):
+        """
+            ###  Roda uma task do gvTaskRunner com a barra de progresso  ###
+
+            onDone e chamada quando a task termina sem ser cancelada
+        """
+        if self.runner.running:
+            cmds.warning("Aguarde o fim de %s" % self.runner.name)
+            return
+
+        self.taskDone = onDone
+        for group in self.toolGroups:
+            group.setEnabled(False)
+        self.taskLabel.setText(name)
+        self.taskProgressBar.setRange(0, 0)
+        self.taskWidget.show()
+        self.runner.start(task, name)
+
+    def taskProgress(self, name, done, total, text, eta):
+        """
+            ###  Atualiza a barra de progresso e o tempo restante  ###
+        """
+        self.taskProgressBar.setRange(0, total)
+        self.taskProgressBar.setValue(done)
+        if eta is None:
+            self.taskLabel.setText(name)
+        else:
+            self.taskLabel.setText('%s  %d:%02d' % ((name,) + divmod(int(eta), 60)))
+        QWidget.setToolTip(self.taskProgressBar, text)
+
+    def taskFinished(self, name, status, error):
+        """
+            ###  Fim da task: reabilita as tools e chama o onDone  ###
+        """
+        self.taskWidget.hide()
+        for group in self.toolGroups:
+            group.setEnabled(True)
+
+        # a task pode ter mudado nomes e a hierarquia
+        selection_service().invalidate()
+
+        onDone, self.taskDone = self.taskDone, None
+        if status == 'done':
+            if onDone is not None:
+                onDone()
+        elif status == 'cancelled':
+            logger.info('%s cancelado' % name)
+        else:
+            cmds.warning('%s falhou: %s' % (name, error))
+
+    def nodeListView(self, model, layout, size=30):
+        """
+            ###  QListView de um NodeListModel, com filtro por nome e menu para adicionar/remover  ###
+        """
+        filterField = QLineEdit()
+        filterField.setPlaceholderText('Filtro')
+        layout.addWidget(filterField)
+
+        # o filtro nao mexe no model, so no que a view mostra
+        proxy = QSortFilterProxyModel(self)
+        proxy.setSourceModel(model)
+        proxy.setFilterCaseSensitivity(Qt.CaseInsensitive)
+        filterField.textChanged.connect(proxy.setFilterFixedString)
+
+        view = QListView()
+        view.setModel(proxy)
+        # We set the icon size of this list
+        view.setIconSize(QSize(size, size))
+        # then we set it to adjust its position when we resize the window
+        view.setResizeMode(QListView.Adjust)
+        # Finally we set the grid size to be just a little larger than our icons to store our text label too
+        view.setGridSize(QSize(size+12, size+12))
+        # todas as linhas tem o mesmo tamanho, a view nao mede cada uma
+        view.setUniformItemSizes(True)
+        view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        layout.addWidget(view)
+
+        addAction = QAction('Adicionar selecao', view)
+        addAction.triggered.connect(partial(self.addItensList, model, True))
+        removeAction = QAction('Remover', view)
+        removeAction.setShortcut(QKeySequence.Delete)
+        removeAction.setShortcutContext(Qt.WidgetShortcut)
+        removeAction.triggered.connect(partial(self.removeItensList, view))
+        view.addAction(addAction)
+        view.addAction(removeAction)
+        view.setContextMenuPolicy(Qt.ActionsContextMenu)
+
+        return view
+
+    def recoverRenames(self):
+        """
+            ###  Desfaz as renomeacoes interrompidas por um crash da sessao anterior  ###
+        """
+        scene = cmds.file(query=True, sceneName=True)
+        journals = [j for j in gvRenamer.pending_journals(gvRenamer.journal_dir()) if j.scene == scene]
+        if not journals:
+            return
+
+        answer = QMessageBox.question(self, 'GV Rigging Tools',
+                                      "Uma renomeacao de %d objetos foi interrompida nesta cena."
+                                      "\nDeseja desfaze-la?" % sum(len(j) for j in journals),
+                                      QMessageBox.Yes | QMessageBox.No)
+        if answer == QMessageBox.Yes:
+            logger.info('%d objetos voltaram ao nome original' % gvRenamer.recover_journals())
+        else:
+            for journal in journals:
+                journal.close()
+
     def removeOverride(self):
         """
             ###  Remove o overrideColor  ###
         """
-        sl = cmds.ls(sl=True, l=True)
+        sl = selection()
 
         if sl:
-            for i in range(len(sl)):
-                shapes = cmds.listRelatives(sl[i], shapes=True)
-                for shape in shapes:
-                    cmds.setAttr(shape + '.overrideEnabled', 0)
+            # todos os shapes de uma vez, um unico undo
+            self.runTask('Remove Override', override_steps(sl.allShapes(), OVERRIDE_OFF))
         else:
             cmds.warning("Selecione antes seu(s) controle(s)")
 
+    def autoColor(self):
+        """
+            ###  Colore os controles pelas regras do preset escolhido  ###
+        """
+        palette = self.palettes.get(self.paletteCombo.currentText())
+        if palette is None:
+            cmds.warning("Nenhum preset de cores encontrado")
+            return
+
+        sl = selection().nodes
+        groups = {}
+
+        def done():
+            logger.info('%d controles coloridos com o preset %s' % (sum(len(g) for g in groups.values()), palette.name))
+
+        self.runTask('Auto Color', palette.colorizeSteps(sl or None, groups=groups), done)
+
     def set_color(self):
         """
             ###  Chama a funcao do color picker  ###
@@ -268,45 +659,60 @@ class RigToolsUI(QWidget):
             ###  Chama a funcao renomear objetos  ###
         """
         newName = self.text_field_rename.text()
-        renamer(self, newName)
+        renamer(self, newName, self.renameFinished)
+
+    def renameFinished(self):
+        """
+            ###  Os nomes da cena mudaram, refaz o preview  ###
+        """
+        self.renamePreviewModel.setNodes([], None)
+        self.updateRenamePreview()
+
+    def updateRenamePreview(self):
+        """
+            ###  Atualiza o preview do renamer com o texto e a selecao atual  ###
+        """
+        newName = self.text_field_rename.text()
+        if not newName or (re.search("#", newName) and re.search("@", newName)):
+            self.renamePreviewModel.setTemplate(None)
+            return
+
+        try:
+            template = compile_template(newName)
+        except ValueError as e:
+            QWidget.setToolTip(self.renamePreview, str(e))
+            self.renamePreviewModel.setTemplate(None)
+            return
+        if not template.fields:
+            template = compile_template(newName + '#')
+        QWidget.setToolTip(self.renamePreview, '')
+
+        # o NameIndex da cena so e refeito quando a selecao muda
+        sl = selection().nodes
+        if sl != self.renamePreviewModel.nodes:
+            self.renamePreviewModel.setNodes(sl, gvRenamer.scene_name_index())
+
+        self.renamePreviewModel.setTemplate(template)
 
-    def addItensList(self, listWidgetObject, listMesh):
+    def addItensList(self, listModel, append=False):
         """
             ###  adiciona os itens selecionados na lista especifica ###
         """
-        sl = cmds.ls(sl=True, l=True)
-        base_dir = os.path.dirname(__file__)+'/icons'
-
-
-        objs_accepted = ['mesh', 'nurbsSurface', 'nurbsCurve']
-
-        meshs = []
-        listWidgetObject.clear()
-
-        for i in range(len(sl)):
-            shapes = cmds.listRelatives(sl[i], shapes=True, noIntermediate=True, fullPath=True)
-            if shapes:
-                for shape in shapes:
-                    objType = cmds.objectType( shape )
-                    if str(objType) == objs_accepted[0] and not sl[i] in meshs:
-                        meshs.append(sl[i])
-                        geo_icon = QIcon(base_dir+'/geo_icon.png')
-                        listMesh.append(sl[i])
-                        item = QListWidgetItem(geo_icon, sl[i])
-                        listWidgetObject.addItem(item)
-                    if str(objType) == objs_accepted[1] and not sl[i] in meshs:
-                        meshs.append(sl[i])
-                        geo_icon = QIcon(base_dir+'/surface_icon.png')
-                        listMesh.append(sl[i])
-                        item = QListWidgetItem(geo_icon, sl[i])
-                        listWidgetObject.addItem(item)
-                    if str(objType) == objs_accepted[2] and not sl[i] in meshs:
-                        meshs.append(sl[i])
-                        geo_icon = QIcon(base_dir+'/curve_icon.png')
-                        listMesh.append(sl[i])
-                        item = QListWidgetItem(geo_icon, sl[i])
-                        listWidgetObject.addItem(item)
-        print listMesh
+        # cada objeto entra uma vez, com o icone do seu primeiro shape aceito
+        items = selection().withShapeType(NodeListModel.iconFiles)
+
+        if append:
+            listModel.appendNodes(items)
+        else:
+            listModel.setNodes(items)
+
+    def removeItensList(self, view):
+        """
+            ###  remove da lista os itens selecionados na view ###
+        """
+        proxy = view.model()
+        rows = [proxy.mapToSource(index).row() for index in view.selectionModel().selectedIndexes()]
+        proxy.sourceModel().removeNodes(rows)
 
     def funcCopySkinBtn(self):
 
@@ -314,33 +720,77 @@ class RigToolsUI(QWidget):
             ###  chama a funcao para copiar o skin de uma lista para a outra  ###
         """
 
-        sourceItems = [str(self.sourceSkinList.item(i).text()) for i in range(self.sourceSkinList.count())]
-        targetItems = [str(self.targetList.item(i).text()) for i in range(self.targetList.count())]
+        sourceItems = list(self.sourceSkinModel.nodes)
+        targetItems = list(self.targetSkinModel.nodes)
 
-        if type(targetItems) is ListType:
-            for targetItems in targetItems:
-                copySkin(sourceItems, targetItems)
-        else:
-            copySkin(sourceItems, targetItems)
+        # as sources sao lidas e indexadas uma vez so para todos os targets
+        stats = {}
+
+        def done():
+            for target, targetStats in stats.items():
+                logger.info('%s: %d pesos removidos, influencias por vertice %.1f -> %.1f (max %d -> %d)' % (
+                    target, targetStats['removed'], targetStats['meanBefore'], targetStats['meanAfter'],
+                    targetStats['maxBefore'], targetStats['maxAfter']))
+
+        self.runTask('Copy Skin', copySkinSteps(sourceItems, targetItems, stats=stats), done)
+
+    def skinFiles(self, save):
+        """
+            ###  pede o arquivo (uma mesh) ou a pasta (varias meshs) dos pesos  ###
+            ###  retorna uma lista de (mesh, arquivo)  ###
+        """
+        sl = selection().transforms()
+        if not sl:
+            cmds.warning("Selecione antes sua(s) mesh(s)")
+            return []
+
+        fileFilter = 'Skin Weights (*%s)' % SKIN_EXTENSION
+        if len(sl) == 1:
+            if save:
+                path = QFileDialog.getSaveFileName(self, 'Save Weights', short_name(sl[0]) + SKIN_EXTENSION, fileFilter)[0]
+            else:
+                path = QFileDialog.getOpenFileName(self, 'Load Weights', '', fileFilter)[0]
+            return [(sl[0], path)] if path else []
+
+        # varias meshs: um arquivo por mesh, com o nome curto dela
+        directory = QFileDialog.getExistingDirectory(self, 'Weights Folder')
+        if not directory:
+            return []
+        return [(obj, os.path.join(directory, short_name(obj) + SKIN_EXTENSION)) for obj in sl]
+
+    def funcSaveSkinBtn(self):
+        """
+            ###  salva os pesos das meshs selecionadas  ###
+        """
+        for obj, path in self.skinFiles(save=True):
+            saveSkin(obj, path)
+            logger.info('%s -> %s' % (obj, path))
+
+    def funcLoadSkinBtn(self):
+        """
+            ###  carrega os pesos salvos nas meshs selecionadas  ###
+        """
+        for obj, path in self.skinFiles(save=False):
+            if not os.path.exists(path):
+                cmds.warning("Arquivo nao encontrado: %s" % path)
+                continue
+            loadSkin(obj, path)
+            logger.info('%s <- %s' % (obj, path))
 
 
 def openColorDialog(self):
     """
         ###  Abre o color picker e seta o override color  ###
     """
-    sl = cmds.ls(sl=True)
+    sl = selection()
 
     if sl:
         color = QColorDialog.getColor()
         if color.isValid():
             rgba = color.getRgbF()
 
-            for i in range(len(sl)):
-                shapes = cmds.listRelatives(sl[i], shapes=True)
-                for shape in shapes:
-                    cmds.setAttr(shape + '.overrideEnabled', 1)
-                    cmds.setAttr(shape + '.overrideRGBColors', 1)
-                    cmds.setAttr(shape + '.overrideColorRGB', rgba[0], rgba[1], rgba[2])
+            # todos os shapes de uma vez, um unico undo
+            self.runTask('Color Override', override_steps(sl.allShapes(), color_values(rgb=rgba[:3])))
         else:
             return
     else:
@@ -350,154 +800,74 @@ def openColorDialog(self):
 def gen_letters(self, length=2):
     """
         ###  Funcao que gera uma sequencia alfabetica de letras,
-        # como por exemplo AAA, AAB, AAC...  ###
+        # como por exemplo AAA, AAB, AAC... AZZ, BAA... ZZZ, AAAA...  ###
     """
-    # lista com todas as letras
-    alphabet = string.ascii_uppercase
-    # Cria uma lista com todas as combinacoes de acordo com o tamanho 'length'
-    letters = ["".join(comb) for comb in cwr(alphabet, length)]
-    for letter in letters:
-        # retorna sob demanda os valores
-        yield letter
+    # a sequencia nunca acaba e nunca repete um nome
+    return letters_constructor(length)
 
 
-def renamer(self, newName=""):
+def renamer(self, newName="", onDone=None):
     """
         ###  Funcao para renomear os objetos  ###
+
+        '#' gera uma sequencia numerica e '@' uma sequencia alfabetica,
+        o nome tambem aceita os templates do gvNameTemplate (<num:3:10:10>, {side}...)
     """
-    sl = cmds.ls(sl=True)
-    letters = []
-    prefix = None
-    suffix = None
-
-    # verifica se o simbolo # esta presente no nome, se estiver, cria uma lista numerica
-    if re.search("#", newName) and not re.search("@", newName):
-        zeros = [l for l in newName if l == "#"]
-        zeros = len(zeros)
-
-        prefix = newName.split('#')[0]
-        suffix = newName.split('#')[-1]
-    # verifica se o simbolo @ esta presente no nome, cria uma lista alfabetica
-    elif re.search("@", newName) and not re.search("#", newName):
-        # verifica quantos @s tem no nome
-        zeros = [l for l in newName if l == "@"]
-        zeros = len(zeros)
-
-        # cria o prefixo e o sufixo do nome
-        prefix = newName.split('@')[0]
-        suffix = newName.split('@')[-1]
-
-        quant = len(sl) # quantidade de objetos
-        letter = gen_letters(self, zeros) # chama a funcao que cria uma lista alfabetica
-                                          # com o length de acordo com a quantidade de @s
-        # looping para adicionar a sequencia alfabetica no nome
-        while True:
-            try:
-                if quant > 0:
-                    letters.append(letter.next())
-                    quant = quant - 1
-                else:
-                    break
-            except:
-                letter = gen_letters(self, zeros)
-                if quant > 0:
-                    letters.append(letter.next())
-                    quant = quant - 1
-                else:
-                    break
+    sl = selection().nodes
+
     # previne que o usuario coloque # e @
-    elif re.search("#", newName) and re.search("@", newName):
+    if re.search("#", newName) and re.search("@", newName):
         cmds.warning("digite exclusivamente '#' ou '@'")
         return
+
+    # o template e compilado uma vez so, e fica em cache
+    try:
+        template = compile_template(newName)
+    except ValueError as e:
+        # token desconhecido, como {foo}
+        cmds.warning(str(e))
+        return
     # se o usuario nao quiser colocar uma sequencia numerica ou alfabetica
-    elif not re.search("#", newName) and not re.search("@", newName):
-        prefix = newName
-        suffix = ""
-        zeros = 0
+    if not template.fields:
+        template = compile_template(newName + '#')
 
     # Finalmente soma-se o prefixo, como numero/letra e o sufixo
     if sl:
-        for mesh in range(len(sl)):
-            if suffix:
-                if not letters:
-                    cmds.rename(sl[mesh], prefix + str(mesh + 1).zfill(zeros) + suffix)
-                else:
-                    cmds.rename(sl[mesh], prefix + str(letters[mesh]) + suffix)
-            else:
-                if not letters:
-                    cmds.rename(sl[mesh], prefix + str(mesh + 1).zfill(zeros))
-                else:
-                    cmds.rename(sl[mesh], prefix + str(letters[mesh]))
+        self.runTask('Rename', renameSteps(template, sl), onDone)
     else:
         raise RuntimeError("Select your mesh")
 
 
-def copySkin(sources, target):
-
+def renameSteps(template, sl):
     """
-        ### Copia o skin de varias ou de apenas uma mesh para outra mesh ###
+        ###  Renomeia os objetos com o template, como task do TaskRunner  ###
 
-        sources = Lista com todas as meshs que ira copiar
-        target = Objeto final que ira ser 'colado' o skin
+        as consultas da cena e os renames ficam na thread principal,
+        os nomes e o plano sao calculados numa thread separada
     """
+    contexts = gvRenamer.template_contexts(template, sl)
+    # resolve os nomes ja existentes antes de renomear, com um unico ls da cena
+    index = gvRenamer.scene_name_index()
 
-    sourceShapes = shapesQuery(sources)
-    targetShapes = shapesQuery(target)
-
-    sourceSkinClusters = skinClusterList(sourceShapes)
-    targetSkinClusters = skinClusterList(targetShapes)
-
-    print sourceSkinClusters
-    print targetSkinClusters
-
-    if targetSkinClusters:
-        cmds.delete(targetSkinClusters)
-
-    influences = [ cmds.skinCluster(skinCl, query=True, inf=True) for skinCl in sourceSkinClusters ]
-    jnts = [ jnt for i in influences for jnt in i]
+    plan, conflicts = yield Background(planRename, template, sl, contexts, index)
+    for old, new in conflicts:
+        logger.info('%s ja existe, %s recebe outro nome' % (new, old))
 
-    if not jnts:
-        print influences, jnts
-        cmds.error("Nao foi encontrado joints na mesh target")
-        return
-
-    print jnts, target
-    cmds.skinCluster(jnts, target, tsb=1, ibp=1)
+    steps = gvRenamer.apply_plan_steps(plan)
+    try:
+        for item in steps:
+            yield item
+    finally:
+        # um cancel fecha tambem o task dos renames (journal, rollback)
+        steps.close()
 
-    cmds.select(clear=True)
-    for source in sources:
-        cmds.select(source, add=True)
-    cmds.select(target, add=True)
-    cmds.copySkinWeights(nm=1,sa="closestPoint", ia="closestJoint")
 
-def shapesQuery(selection):
+def planRename(template, sl, contexts, index):
     """
-        ### retorna uma lista com todos os shapes de uma selecao ####
+        ###  Plano dos renames, sem acessar a cena  ###
     """
-    if type(selection) is ListType:
-        shapes = [cmds.listRelatives(s, shapes=True, fullPath=True, noIntermediate=True) for s in selection]
-    else:
-        shapes = cmds.listRelatives(selection, shapes=True, fullPath=True, noIntermediate=True)
-
-    print shapes
-    return shapes
-
-def skinClusterList(shapes):
-    """
-        ### retorna uma lista com os skinClusters Node ####
-    """
-    skinClusters = []
-    for obj in shapes:
-        if type(obj) is ListType:
-            for shape in obj:
-                if not cmds.listConnections(shape, type='skinCluster') == None:
-                    skinClusters.append(cmds.listConnections(shape, type='skinCluster'))
-        else:
-            if not cmds.listConnections(obj, type='skinCluster') == None:
-                    skinClusters.append(cmds.listConnections(obj, type='skinCluster'))
-
-    skinClusters = [ shape for obj in skinClusters for shape in obj ]
+    newNames = plan_names(template.pattern, len(sl), contexts=contexts)
+    return resolve_conflicts(build_plan(sl, newNames), index)
 
-    return skinClusters
 
 x = RigToolsUI()
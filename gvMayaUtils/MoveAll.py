@@ -1,6 +1,9 @@
 import pymel.core as pm
 from maya import cmds
 
+import gvColorPalette
+from gvColorOverride import apply_override, color_values, override_shapes
+
 class MOVEALL(object):
     def __init__(self):
 
@@ -125,7 +128,7 @@ class MOVEALL(object):
         pm.setAttr("%s.sz" % self.deformerCtrl, lock=True, keyable=False, channelBox=False)
         pm.setAttr("%s.visibility" % self.deformerCtrl, lock=True, keyable=False, channelBox=False)
 
-        setCtrlColor(transform=self.deformerCtrl, colorid=17)
+        setCtrlColor(transform=self.deformerCtrl, color='deform')
 
         pm.addAttr(self.deformerCtrl.fullPath(), longName="deformFactor", at="double3", keyable=True)
         pm.addAttr(self.deformerCtrl.fullPath(), longName="deformFactorX", p="deformFactor", at="double", keyable=True)
@@ -188,19 +191,19 @@ class MOVEALL(object):
         self.globalGrp, self.globalCtrl = createController(grpName = 'global_ctrl_grp',
                                                            ctrlName = 'global_ctrl',
                                                            r = radius+3*(radius/3))
-        setCtrlColor(transform=self.globalCtrl, colorid=1)
+        setCtrlColor(transform=self.globalCtrl, color='global')
         self.masterGrp, self.masterCtrl = createController(grpName = 'master_ctrl_grp',
                                                            ctrlName = 'master_ctrl',
                                                            r = radius+2*(radius/3))
-        setCtrlColor(transform=self.masterCtrl, colorid=4)
+        setCtrlColor(transform=self.masterCtrl, color='master')
         self.rootGrp, self.rootCtrl     = createController(grpName = 'root_ctrl_grp',
                                                            ctrlName = 'root_ctrl',
                                                            r = radius+(radius/3))
-        setCtrlColor(transform=self.rootCtrl, colorid=13)
+        setCtrlColor(transform=self.rootCtrl, color='root')
         self.middleGrp, self.middleCtrl = createController(grpName = 'middle_ctrl_grp',
                                                            ctrlName = 'middle_ctrl',
                                                            r = radius)
-        setCtrlColor(transform=self.middleCtrl, colorid=14)
+        setCtrlColor(transform=self.middleCtrl, color='middle')
         self.createHierarchy()
         self.configureMiddle()
         self.configureAllGrp()
@@ -214,13 +217,25 @@ class MOVEALL(object):
 
         self.createUUIDAttr()
 
-def setCtrlColor(transform, colorid):
+def setCtrlColor(transform, colorid=None, palette=None, color=None):
+    """
+        ### cor do controle: o colorid, a cor do palette pelo nome da cor,
+        ### ou a cor das regras do palette pelo nome do controle ###
+    """
+    if colorid is None:
+        palette = palette or gvColorPalette.preset()
+        if color is None:
+            # sem namespace e sem o numero que o Maya soma num segundo rig (global_ctrl1)
+            name = str(transform).rsplit('|', 1)[-1].rsplit(':', 1)[-1]
+            color = palette.match(name) or palette.match(name.rstrip('0123456789'))
+        if color not in palette.colors:
+            cmds.warning('%s: nenhuma cor do preset %s' % (transform, palette.name))
+            return
+        values = palette.values(color)
+    else:
+        values = color_values(index=colorid)
 
-    shapes = pm.listRelatives(transform, shapes=True, noIntermediate=True)
-    if shapes:
-        for shape in shapes:
-            pm.setAttr("%s.overrideEnabled" % shape, 1)
-            pm.setAttr("%s.overrideColor" % shape, colorid)
+    apply_override(override_shapes([str(transform)]), values)
 
 def parentAndScale(ctrl, target):
     pm.parentConstraint(ctrl, target, mo=True)
@@ -0,0 +1,148 @@
+"""
+#
+# # Color override benchmarks over the in-memory maya scene of gvFakeMaya
+#
+# Compares the per transform loop that openColorDialog/removeOverride used
+# (one listRelatives per transform, one setAttr per plug, one undo step per
+# edit) with gvColorOverride (one listRelatives, one undo step), and records
+# the backend calls (commands and 'api.' calls) and undo steps of each run. gvColorOverride runs twice:
+# 'bulk' without the API (setAttr calls in one undo chunk) and 'modifier'
+# with the MDGModifier of gvUndo over gvFakeMaya.FakeOpenMaya, the path used
+# inside Maya.
+#
+#     mayapy gvColorBenchmark.py --sizes 1000 3000 10000 --json color.json
+#
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+from timeit import default_timer as timer
+
+import gvFakeMaya
+gvFakeMaya.install()
+
+import gvColorOverride
+import gvUndo
+
+
+SIZES = (1000, 3000, 10000)
+OPERATIONS = ('color', 'remove')
+ENGINES = ('legacy', 'bulk', 'modifier')
+RGB = (1.0, 0.2, 0.1)
+
+
+def build_controls(count, shapesPerControl=1):
+    """
+    :return: (FakeCmds, list of control long names)
+    """
+    cmds = gvFakeMaya.FakeCmds()
+    controls = []
+    for i in range(count):
+        ctrl = cmds.scene.createNode('transform', 'ctrl%d' % i)
+        for j in range(shapesPerControl):
+            cmds.scene.createNode('nurbsCurve', 'ctrl%dShape%d' % (i, j), parent=ctrl)
+        controls.append(ctrl.longName())
+    return cmds, controls
+
+
+def legacy_color(cmds, nodes, rgb=RGB):
+    """
+    # # the loop of the original openColorDialog
+    """
+    for node in nodes:
+        for shape in cmds.listRelatives(node, shapes=True):
+            cmds.setAttr(shape + '.overrideEnabled', 1)
+            cmds.setAttr(shape + '.overrideRGBColors', 1)
+            cmds.setAttr(shape + '.overrideColorRGB', rgb[0], rgb[1], rgb[2])
+
+
+def legacy_remove(cmds, nodes):
+    """
+    # # the loop of the original RigToolsUI.removeOverride
+    """
+    for node in nodes:
+        for shape in cmds.listRelatives(node, shapes=True):
+            cmds.setAttr(shape + '.overrideEnabled', 0)
+
+
+def bench(size, operation, engine, shapesPerControl=1):
+    """
+    #
+    # # time one color edit of size controls
+    #
+    :param operation: 'color' or 'remove'
+    :param engine: 'legacy', 'bulk' or 'modifier'
+    :return: dict with the results
+    """
+    cmds, controls = build_controls(size, shapesPerControl)
+    gvColorOverride.cmds = cmds
+    gvUndo.cmds = cmds
+    gvUndo.om = gvFakeMaya.FakeOpenMaya(cmds) if engine == 'modifier' else None
+
+    start = timer()
+    if engine == 'legacy':
+        if operation == 'color':
+            legacy_color(cmds, controls)
+        else:
+            legacy_remove(cmds, controls)
+    elif operation == 'color':
+        gvColorOverride.set_override_color(controls, RGB)
+    else:
+        gvColorOverride.remove_override(controls)
+    seconds = timer() - start
+
+    return {'bench'          : operation,
+            'engine'         : engine,
+            'size'           : size,
+            'shapes'         : size * shapesPerControl,
+            'seconds'        : seconds,
+            'shapesPerSecond': size * shapesPerControl / seconds if seconds else 0.0,
+            'calls'          : dict(cmds.calls),
+            'totalCalls'     : cmds.totalCalls(),
+            'commandCalls'   : sum(count for name, count in cmds.calls.items() if not name.startswith('api.')),
+            'undoEntries'    : cmds.undoEntries}
+
+
+def run(sizes=SIZES, operations=OPERATIONS, shapesPerControl=1):
+    """
+    # # every operation with every engine, each result gets its speedup over legacy
+    """
+    results = []
+    for size in sizes:
+        for operation in operations:
+            runs = [bench(size, operation, engine, shapesPerControl) for engine in ENGINES]
+            for r in runs:
+                r['speedup'] = runs[0]['seconds'] / r['seconds'] if r['seconds'] else 0.0
+            results.extend(runs)
+    return results
+
+
+def report(results, stream=sys.stdout):
+    line = '{:<8}{:<10}{:>8}{:>10}{:>12}{:>14}{:>10}{:>8}{:>9}'
+    print(line.format('bench', 'engine', 'size', 'seconds', 'shapes/s', 'backendCalls', 'commands', 'undo', 'speedup'),
+          file=stream)
+    for r in results:
+        print(line.format(r['bench'], r['engine'], r['size'], '%.3f' % r['seconds'], '%d' % r['shapesPerSecond'],
+                          r['totalCalls'], r['commandCalls'], r['undoEntries'], '%.1fx' % r['speedup']), file=stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gvColorOverride benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--shapes', type=int, default=1, help='shapes per control')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.operations, args.shapes)
+    report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""
+#
+# # Color override of many shapes at once
+#
+# The shapes of all the nodes are listed with one listRelatives call, then
+# every override attribute is queued in one OpenMaya MDGModifier, done in
+# batches of shapes (see override_groups_steps):
+#
+#   undoable=True:  the modifier is put in the undo queue as one step (gvUndo)
+#   undoable=False: the modifier is not in the undo queue, for rig builds
+#
+# Without the API the plugs are written with maya.cmds setAttr calls, one undo
+# chunk per batch (cmds.setAttr has no multi plug form).
+#
+"""
+import maya.cmds as cmds
+
+import gvUndo
+from gvTaskRunner import Progress, run_task
+
+
+# values of remove_override
+OVERRIDE_OFF = [('overrideEnabled', False)]
+# shapes written per yield of override_groups_steps
+OVERRIDE_BATCH = 500
+
+
+def override_shapes(nodes):
+    """
+    # # shapes of the nodes, one listRelatives for all of them
+    #
+    :param nodes: list of transforms
+    :return: list of shape long names, without repetitions
+    """
+    if not nodes:
+        return []
+
+    shapes = cmds.listRelatives(nodes, shapes=True, fullPath=True, noIntermediate=True) or []
+
+    seen = set()
+    return [shape for shape in shapes if not (shape in seen or seen.add(shape))]
+
+
+def color_values(rgb=None, index=None):
+    """
+    #
+    # # override attributes of a color
+    #
+    :param rgb: (r, g, b) floats 0..1
+    :param index: color index of the maya palette, used if rgb is None
+    :return: list of (attribute, value), value being a tuple for compounds
+    """
+    if rgb is not None:
+        return [('overrideEnabled', True),
+                ('overrideRGBColors', True),
+                ('overrideColorRGB', tuple(float(c) for c in rgb[:3]))]
+
+    return [('overrideEnabled', True),
+            ('overrideRGBColors', False),
+            ('overrideColor', int(index))]
+
+
+def set_override_color(nodes, rgb=None, index=None, undoable=True, shapes=None):
+    """
+    #
+    # # set the override color of every shape of the nodes
+    #
+    :param nodes: list of transforms
+    :param rgb: (r, g, b) floats 0..1
+    :param index: color index of the maya palette, used if rgb is None
+    :param undoable: see the module docstring
+    :param shapes: shapes of the nodes if already known (gvSelection), not queried again
+    :return: list of the shapes edited
+    """
+    shapes = override_shapes(nodes) if shapes is None else shapes
+    apply_override(shapes, color_values(rgb, index), undoable)
+    return shapes
+
+
+def remove_override(nodes, undoable=True, shapes=None):
+    """
+    #
+    # # disable the override of every shape of the nodes
+    #
+    :param shapes: shapes of the nodes if already known, see set_override_color
+    :return: list of the shapes edited
+    """
+    shapes = override_shapes(nodes) if shapes is None else shapes
+    apply_override(shapes, OVERRIDE_OFF, undoable)
+    return shapes
+
+
+def apply_override(shapes, values, undoable=True):
+    """
+    #
+    # # write the same attribute values on every shape, in one batch
+    #
+    :param shapes: list of shape names
+    :param values: list of (attribute, value), see color_values
+    :param undoable: put the edit in the undo queue, see the module docstring
+    :return: None
+    """
+    # the batches of override_steps in one undo step
+    cmds.undoInfo(openChunk=True, chunkName='gvColorOverride')
+    try:
+        run_task(override_steps(shapes, values, undoable))
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+
+def override_steps(shapes, values, undoable=True, batch=OVERRIDE_BATCH):
+    """
+    # # apply_override as a gvTaskRunner task, see override_groups_steps
+    """
+    return override_groups_steps([(shapes, values)], undoable, batch)
+
+
+def override_groups_steps(groups, undoable=True, batch=OVERRIDE_BATCH):
+    """
+    #
+    # # write attribute values on groups of shapes, as a gvTaskRunner task
+    #
+    # The plug values are queued in one MDGModifier, done batch by batch of
+    # shapes and, when undoable, put in the undo queue as a single step at the
+    # end (gvUndo): no undo chunk stays open while the UI runs. An error or a
+    # cancel undoes the modifier. Without the API every batch is a setAttr
+    # undo chunk, and a cancel keeps the batches already written.
+    #
+    :param groups: list of (list of shape names, list of (attribute, value))
+    :param undoable: put the edit in the undo queue, see the module docstring
+    :param batch: shapes written per yield
+    :return: generator
+    """
+    items = [(shape, values) for shapes, values in groups for shape in shapes]
+    if not items:
+        return
+
+    modifier = nodes = None
+    if gvUndo.available():
+        modifier = gvUndo.modifier()
+        nodes = gvUndo.dependency_nodes([shape for shape, values in items])
+
+    try:
+        for start in range(0, len(items), batch):
+            yield Progress(start, len(items), 'override')
+            stop = start + batch
+            if modifier is not None:
+                for node, (shape, values) in zip(nodes[start:stop], items[start:stop]):
+                    _queue_values(modifier, node, values)
+                modifier.doIt()
+                continue
+
+            cmds.undoInfo(openChunk=True, chunkName='gvColorOverride')
+            try:
+                for shape, values in items[start:stop]:
+                    _set_values(shape, values)
+            finally:
+                cmds.undoInfo(closeChunk=True)
+
+        if modifier is not None and undoable:
+            gvUndo.commit(modifier)
+    except BaseException:
+        # errors and cancels (GeneratorExit)
+        if modifier is not None:
+            modifier.undoIt()
+        raise
+
+
+def _set_values(shape, values):
+    for attribute, value in values:
+        plug = '%s.%s' % (shape, attribute)
+        if isinstance(value, tuple):
+            cmds.setAttr(plug, *value)
+        else:
+            cmds.setAttr(plug, value)
+
+
+def _queue_values(modifier, node, values):
+    for attribute, value in values:
+        plug = gvUndo.find_plug(node, attribute)
+        if isinstance(value, tuple):
+            for child, component in enumerate(value):
+                modifier.newPlugValueFloat(plug.child(child), component)
+        elif isinstance(value, bool):
+            modifier.newPlugValueBool(plug, value)
+        else:
+            modifier.newPlugValueInt(plug, value)
@@ -0,0 +1,205 @@
+"""
+#
+# # Color palettes: rules from control names to override colors
+#
+# A preset is a JSON file of the palettes directory:
+#
+#   {"name": "default",
+#    "colors": {"left": {"rgb": [0.0, 0.2, 1.0]}, "global": {"index": 1}, ...},
+#    "rules":  [{"pattern": "^global_ctrl$", "color": "global"},
+#               {"side": "L", "color": "left"}, ...]}
+#
+# A rule has a regex 'pattern' or a 'side' (L matches _L_, L_ at the start,
+# _L at the end). The rules are tried in order, the first match gives the
+# color. They are compiled into one regex: every name of the scene is matched
+# once, whatever the amount of rules.
+#
+"""
+import glob
+import json
+import os
+import re
+
+import maya.cmds as cmds
+
+from gvColorOverride import color_values, override_groups_steps
+from gvTaskRunner import Progress, run_task
+
+
+# presets shipped with the tools
+PRESET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'palettes')
+# control shapes colored by Palette.colorize
+CONTROL_TYPES = ('nurbsCurve',)
+
+# presets by name, loaded by presets()
+_presets = None
+
+
+class Palette(object):
+    """
+    # # named colors and ordered name rules
+    """
+    def __init__(self, name, colors, rules):
+        """
+        :param name: name of the palette
+        :param colors: dict color name -> {'rgb': (r, g, b)} or {'index': int}
+        :param rules: list of {'pattern': regex} or {'side': 'L'}, each with a 'color'
+        """
+        self.name = name
+        self.colors = colors
+        self.rules = rules
+
+        missing = [rule['color'] for rule in rules if rule['color'] not in colors]
+        if missing:
+            raise ValueError('palette %s: unknown colors %s' % (name, ', '.join(missing)))
+
+        # one lookahead per rule: the first alternative that matches wins, and
+        # its group tells which rule it was
+        branches = ['(?=.*?(?P<r%d>%s))' % (i, rule_pattern(rule)) for i, rule in enumerate(rules)]
+        self.regex = re.compile('^(?:%s)' % '|'.join(branches)) if branches else None
+
+    def __repr__(self):
+        return 'Palette(%r, %d colors, %d rules)' % (self.name, len(self.colors), len(self.rules))
+
+    @classmethod
+    def fromDict(cls, data):
+        return cls(data['name'], data.get('colors', {}), data.get('rules', []))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.fromDict(json.load(f))
+
+    def toDict(self):
+        return {'name': self.name, 'colors': self.colors, 'rules': self.rules}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.toDict(), f, indent=2, sort_keys=True)
+
+    def match(self, name):
+        """
+        :param name: short name of a control
+        :return: color name of the first rule matching name, None if no rule matches
+        """
+        if self.regex is None:
+            return None
+
+        found = self.regex.match(name)
+        if found is None:
+            return None
+        return self.rules[int(found.lastgroup[1:])]['color']
+
+    def values(self, color):
+        """
+        :return: override attribute values of a color, see gvColorOverride.color_values
+        """
+        entry = self.colors[color]
+        return color_values(rgb=entry.get('rgb'), index=entry.get('index'))
+
+    def assign(self, shapes):
+        """
+        #
+        # # group shapes by the color of their transform
+        #
+        :param shapes: list of shape long names
+        :return: dict color name -> list of shapes
+        """
+        groups = {}
+        for shape in shapes:
+            # the transform is in the long name of the shape, no query needed
+            transform = shape.rsplit('|', 1)[0].rsplit('|', 1)[-1]
+            color = self.match(transform.rsplit(':', 1)[-1])
+            if color is not None:
+                groups.setdefault(color, []).append(shape)
+        return groups
+
+    def colorize(self, nodes=None, shapeTypes=CONTROL_TYPES, undoable=True):
+        """
+        #
+        # # color every control shape matching a rule, in one pass
+        #
+        # The shapes come from one ls (of the scene, or of the nodes and their
+        # descendants), then every color is written in one batch, all in one
+        # undo step.
+        #
+        :param nodes: limit to these nodes and their descendants, the whole scene if None
+        :param shapeTypes: types of shape colored
+        :param undoable: see gvColorOverride
+        :return: dict color name -> list of shapes colored
+        """
+        groups = {}
+        # the batches of colorizeSteps in one undo step
+        cmds.undoInfo(openChunk=True, chunkName='gvColorPalette')
+        try:
+            run_task(self.colorizeSteps(nodes, shapeTypes, undoable, groups))
+        finally:
+            cmds.undoInfo(closeChunk=True)
+        return groups
+
+    def colorizeSteps(self, nodes=None, shapeTypes=CONTROL_TYPES, undoable=True, groups=None):
+        """
+        #
+        # # colorize as a gvTaskRunner task
+        #
+        # The scene query and the matching run first, then the shapes of every
+        # color are written in batches by gvColorOverride.override_groups_steps,
+        # one undo step for all the colors.
+        #
+        :param groups: dict receiving color name -> list of shapes colored
+        :return: generator
+        """
+        groups = {} if groups is None else groups
+        if nodes is None:
+            shapes = cmds.ls(type=list(shapeTypes), long=True, noIntermediate=True) or []
+        elif nodes:
+            shapes = cmds.ls(nodes, dag=True, type=list(shapeTypes), long=True, noIntermediate=True) or []
+        else:
+            shapes = []
+
+        yield Progress(0, len(shapes), 'match')
+        groups.update(self.assign(shapes))
+        if not groups:
+            return
+
+        steps = override_groups_steps([(colorShapes, self.values(color)) for color, colorShapes in groups.items()],
+                                      undoable)
+        try:
+            for item in steps:
+                yield item
+        finally:
+            steps.close()
+
+
+def rule_pattern(rule):
+    """
+    :return: regex of a rule, its 'pattern' or the regex of its 'side'
+    """
+    if 'side' in rule:
+        return '(?:^|_)%s(?:_|$)' % re.escape(rule['side'])
+    return rule['pattern']
+
+
+def load_presets(directory=PRESET_DIR):
+    """
+    :return: dict name -> Palette of every .json file of the directory
+    """
+    palettes = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        palette = Palette.load(path)
+        palettes[palette.name] = palette
+    return palettes
+
+
+def presets(reload=False):
+    """
+    # # the shipped presets, loaded once
+    """
+    global _presets
+    if _presets is None or reload:
+        _presets = load_presets()
+    return _presets
+
+
+def preset(name='default'):
+    return presets()[name]
@@ -0,0 +1,432 @@
+"""
+#
+# # Copy skin from one or more source meshes to target meshes
+#
+# 'closestPoint' mode: the weights of all the sources are read as arrays, one
+# spatial index is built over the combined source points and every target is
+# transferred with vectorized closest point / barycentric interpolation
+# (gvSkinTransfer, in a worker pool when there are several targets), then
+# written with one setWeights call.
+# 'copySkinWeights' mode: the original cmds.copySkinWeights path, also used
+# when numpy is not available.
+#
+# copySkinSteps is the same copy as a gvTaskRunner task, for the UI.
+#
+"""
+import maya.cmds as cmds
+
+from functools import partial
+
+import gvSkinCluster
+import gvSkinFile
+from gvSkinCache import SkinCache
+from gvSkinWeights import PRUNE_THRESHOLD, np, prune_weights
+from gvSkinTransfer import TOLERANCE, ClosestPointTransfer, SourceSkin, TransferState, transfer_many
+from gvTaskRunner import Background, Progress, run_task
+
+
+# source skin data kept between copy skin operations of the session
+sourceCache = SkinCache()
+# topology hash of the target shapes, by shape UUID
+topologyCache = SkinCache(topologyOnly=True)
+# last transfer of the target shapes (TransferState), by shape UUID
+transferCache = SkinCache(topologyOnly=True)
+# last combination of several sources: (source UUIDs, parts, combined SourceSkin)
+_combined = [None, None, None]
+
+
+def copySkin(sources, target, mode='closestPoint'):
+    """
+        ### Copia o skin de varias ou de apenas uma mesh para outra mesh ###
+
+        sources = Lista com todas as meshs que ira copiar
+        target = Objeto final que ira ser 'colado' o skin
+    """
+    copySkinTargets(sources, [target], mode)
+
+
+def copySkinTargets(sources, targets, mode='closestPoint', processes=None, useProcesses=True, cache=None,
+                    pruneThreshold=PRUNE_THRESHOLD, maxInfluences=None, stats=None,
+                    incremental=True, tolerance=TOLERANCE):
+    """
+    #
+    # # copy the skin of the sources to every target
+    #
+    # The source shapes, skinClusters, influences, points and weights are
+    # gathered once for the whole list, the influences of all the sources
+    # merged by UUID. A target with the topology of a single source mesh
+    # (same topology hash) gets a direct copy of its weights, the others the
+    # closest point transfer. With incremental, a target transferred before
+    # from the same (unchanged) source only gets the points that moved more
+    # than tolerance transferred again. The weights are then pruned, capped and
+    # normalized (gvSkinWeights.prune_weights), and every target is bound only
+    # to the influences that kept some weight. The weights of the targets are
+    # computed in a worker pool, and only the binding and the writes run
+    # here on the main thread, in one undo chunk. See copySkinSteps.
+    #
+    :param sources: list of source transforms
+    :param targets: list of target transforms
+    :param mode: 'closestPoint' (arrays) or 'copySkinWeights' (maya command)
+    :param processes: amount of workers, cpu count by default
+    :param useProcesses: process pool instead of thread pool
+    :param cache: SkinCache of the source data, the session cache by default
+    :param pruneThreshold: transferred weights below this are dropped
+    :param maxInfluences: influences kept per vertex, no cap if None
+    :param stats: dict filled with the prune_weights counters of every target,
+                  and 'transferred' (points transferred again)
+    :param incremental: reuse the previous transfer of the targets
+    :param tolerance: distance a target point may move and keep its weights
+    :return: list of the new skinClusters
+    """
+    skinClusters = []
+    # the targets of copySkinSteps in one undo step
+    cmds.undoInfo(openChunk=True, chunkName='gvCopySkin')
+    try:
+        run_task(copySkinSteps(sources, targets, mode, processes, useProcesses, cache, pruneThreshold,
+                               maxInfluences, stats, incremental, tolerance, skinClusters))
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    return skinClusters
+
+
+def copySkinSteps(sources, targets, mode='closestPoint', processes=None, useProcesses=False, cache=None,
+                  pruneThreshold=PRUNE_THRESHOLD, maxInfluences=None, stats=None,
+                  incremental=True, tolerance=TOLERANCE, skinClusters=None):
+    """
+    #
+    # # copySkinTargets as a gvTaskRunner task
+    #
+    # The scene reads run between the yields, the transfer and the pruning
+    # (arrays only) in one Background call. Then every target is bound and
+    # written in its own slice and undo chunk: the chunk never stays open
+    # while the UI runs (the user edits would end up in it), and a cancel
+    # leaves every target either with its old skinCluster or its new one.
+    #
+    :param useProcesses: False by default, the task runs inside the Maya UI
+    :param skinClusters: list receiving the new skinClusters
+    :return: generator, the other parameters are the ones of copySkinTargets
+    """
+    skinClusters = [] if skinClusters is None else skinClusters
+    total = 2 * len(targets) + 2
+
+    if mode == 'copySkinWeights' or np is None:
+        for i, target in enumerate(targets):
+            yield Progress(i, len(targets), target)
+            skinClusters.append(copySkinWeights(sources, target))
+        return
+
+    yield Progress(0, total, 'sources')
+    source = gatherSources(sources, sourceCache if cache is None else cache)
+    if source is None:
+        cmds.error("Nao foi encontrado skinCluster nas meshs source")
+        return
+
+    # scene queries stay on the main thread
+    targetShapes = [shapesQuery(target)[0] for target in targets]
+    targetUUIDs = cmds.ls(targetShapes, uuid=True) or []
+    if len(targetUUIDs) != len(targetShapes):
+        targetUUIDs = [None] * len(targetShapes)
+
+    # targets with the topology of the source: weights copied index to index
+    copied = set()
+    if source.topologyHash is not None:
+        hashes = targetTopologyHashes(targetShapes, targetUUIDs)
+        copied = set(i for i, topologyHash in enumerate(hashes) if topologyHash == source.topologyHash)
+
+    targetPoints = {}
+    states = {}
+    for i in range(len(targets)):
+        if i in copied:
+            continue
+        yield Progress(i + 1, total, targets[i])
+        targetPoints[i] = gvSkinCluster.points(targetShapes[i])
+        # targets transferred before from this source: only the points that moved
+        state = transferCache.peek(targetUUIDs[i]) if incremental and targetUUIDs[i] else None
+        if state is not None and state.matches(source, targetPoints[i]):
+            states[i] = state
+
+    yield Progress(len(targets) + 1, total, 'transfer')
+    allWeights, newStates, targetStats = yield Background(
+        targetWeights, source, len(targets), copied, targetPoints, states, processes, useProcesses,
+        pruneThreshold, maxInfluences, tolerance)
+
+    for i, state in newStates.items():
+        if targetUUIDs[i]:
+            transferCache.put(targetUUIDs[i], state, [targetShapes[i]])
+    if stats is not None:
+        stats.update(zip(targets, targetStats))
+
+    for i, (target, targetShape, weights) in enumerate(zip(targets, targetShapes, allWeights)):
+        yield Progress(len(targets) + 2 + i, total, target)
+        cmds.undoInfo(openChunk=True, chunkName='gvCopySkin')
+        try:
+            skinCl = bindTarget(target, weights.influences)
+            gvSkinCluster.write_skin_weights(skinCl, weights, targetShape)
+            skinClusters.append(skinCl)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+
+def targetWeights(source, count, copied, targetPoints, states, processes=None, useProcesses=True,
+                  pruneThreshold=PRUNE_THRESHOLD, maxInfluences=None, tolerance=TOLERANCE):
+    """
+    #
+    # # weights of the targets, arrays only (no scene access, runs on a worker thread)
+    #
+    :param source: SourceSkin
+    :param count: amount of targets
+    :param copied: indices of the targets with the topology of the source
+    :param targetPoints: dict index -> points of the other targets
+    :param states: dict index -> TransferState of the targets updated incrementally
+    :return: (list of pruned SkinWeights with only their used influences,
+              dict index -> new TransferState, list of prune stats)
+    """
+    allWeights = [None] * count
+    transferred = [0] * count
+    newStates = {}
+
+    for i in copied:
+        allWeights[i] = source.weights.copy()
+
+    transfer = None
+    for i, state in states.items():
+        transfer = transfer or ClosestPointTransfer(source)
+        allWeights[i], newStates[i], transferred[i] = transfer.update(state, targetPoints[i], tolerance)
+
+    full = [i for i in sorted(targetPoints) if i not in states]
+    for i, weights in zip(full, transfer_many(source, [targetPoints[i] for i in full], processes, useProcesses)):
+        allWeights[i] = weights
+        transferred[i] = weights.vertexCount
+        newStates[i] = TransferState(source, targetPoints[i], weights)
+
+    pruned = []
+    allStats = []
+    for weights, transferredCount in zip(allWeights, transferred):
+        targetStats = {'transferred': transferredCount}
+        # only the influences with some transferred weight are bound
+        pruned.append(prune_weights(weights, pruneThreshold, maxInfluences, targetStats).pruneInfluences())
+        allStats.append(targetStats)
+
+    return pruned, newStates, allStats
+
+
+def targetTopologyHashes(shapes, uuids, cache=None):
+    """
+    #
+    # # topology hash of every shape, computed once and kept until the shape changes
+    #
+    :param shapes: list of shape names
+    :param uuids: their UUIDs (None: not cached)
+    :param cache: SkinCache of the hashes, topologyCache by default
+    :return: list of hex strings (None for non mesh shapes)
+    """
+    cache = topologyCache if cache is None else cache
+    return [cache.get(uuid, partial(loadTopologyHash, shape)) if uuid else gvSkinCluster.topology_hash(shape)
+            for shape, uuid in zip(shapes, uuids)]
+
+
+def loadTopologyHash(shape):
+    """
+    :return: (topology hash of the shape, shape to watch) for the SkinCache
+    """
+    return gvSkinCluster.topology_hash(shape), [shape]
+
+
+def gatherSources(sources, cache):
+    """
+    #
+    # # combined source data of the source transforms, through the cache
+    #
+    # Only the UUIDs are queried (one ls) when every source is cached and
+    # unchanged since the last copy skin. The combination of several sources
+    # is kept too, so an unchanged source list gives the same SourceSkin
+    # (see TransferState.matches).
+    #
+    :param sources: list of source transforms
+    :param cache: gvSkinCache.SkinCache
+    :return: gvSkinTransfer.SourceSkin, None if no source is skinned
+    """
+    uuids = cmds.ls(sources, uuid=True) or []
+    if len(uuids) != len(sources):
+        cmds.error("Alguma mesh source nao existe mais")
+        return None
+
+    parts = [cache.get(uuid, partial(loadSource, source)) for source, uuid in zip(sources, uuids)]
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    if len(parts) == 1:
+        return parts[0]
+
+    lastUUIDs, lastParts, combined = _combined
+    if lastUUIDs == uuids and len(lastParts) == len(parts) and all(a is b for a, b in zip(lastParts, parts)):
+        return combined
+
+    _combined[:] = [uuids, parts, SourceSkin.combine(parts)]
+    return _combined[2]
+
+
+def loadSource(transform):
+    """
+    #
+    # # source data of one transform for the SkinCache
+    #
+    :return: (SourceSkin or None, shapes and skinClusters to watch)
+    """
+    shapes = shapesQuery(transform) or []
+    skinClusters = skinClusterList(shapes)
+    if not skinClusters:
+        return None, shapes
+
+    return gatherSource(skinClusters), shapes + skinClusters
+
+
+def gatherSource(skinClusters):
+    """
+    #
+    # # points, triangles and weights of every source skinCluster, combined
+    #
+    :param skinClusters: list of skinCluster names
+    :return: gvSkinTransfer.SourceSkin
+    """
+    sources = []
+    for skinCl in skinClusters:
+        shape = gvSkinCluster.skinned_shape_name(skinCl)
+        weights = gvSkinCluster.read_skin_weights(skinCl, shape)
+        sources.append(SourceSkin(gvSkinCluster.points(shape),
+                                  weights,
+                                  gvSkinCluster.triangles(shape),
+                                  gvSkinCluster.influence_uuids(weights.influences),
+                                  gvSkinCluster.topology_hash(shape) if len(skinClusters) == 1 else None))
+
+    return SourceSkin.combine(sources)
+
+
+def bindTarget(target, influences):
+    """
+    #
+    # # replace the skinCluster of the target by a new one with the influences
+    #
+    :return: name of the new skinCluster
+    """
+    targetSkinClusters = skinClusterList(shapesQuery(target))
+    if targetSkinClusters:
+        cmds.delete(targetSkinClusters)
+
+    return cmds.skinCluster(influences, target, tsb=1, ibp=1)[0]
+
+
+def saveSkin(target, path, sparse=None):
+    """
+    #
+    # # save the weights of a skinned transform to a gvSkinFile weights file
+    #
+    :param target: skinned transform
+    :param path: file path
+    :param sparse: CSR layout, automatic by default
+    :return: path
+    """
+    skinClusters = skinClusterList(shapesQuery(target))
+    if not skinClusters:
+        cmds.error("Nao foi encontrado skinCluster em %s" % target)
+        return None
+
+    skinCl = skinClusters[0]
+    shape = gvSkinCluster.skinned_shape_name(skinCl)
+    return gvSkinFile.save_weights(path, gvSkinCluster.read_skin_weights(skinCl, shape), sparse)
+
+
+def loadSkin(target, path):
+    """
+    #
+    # # bind the target to the influences of a weights file and write its weights
+    #
+    # The file is memory mapped, its weights are read once by the write.
+    #
+    :param target: transform with the same vertex count as the saved mesh
+    :param path: file path
+    :return: name of the new skinCluster
+    """
+    weights = gvSkinFile.load_weights(path)
+    existing = set(cmds.ls(weights.influences, long=True) or [])
+    missing = [name for name in weights.influences if name not in existing]
+    if missing:
+        cmds.error("Influencias nao encontradas na cena: %s" % ', '.join(missing))
+        return None
+
+    targetShape = shapesQuery(target)[0]
+    if gvSkinCluster.point_count(targetShape) != weights.vertexCount:
+        cmds.error("%s nao tem os %d vertices do arquivo" % (target, weights.vertexCount))
+        return None
+
+    cmds.undoInfo(openChunk=True, chunkName='gvLoadSkin')
+    try:
+        skinCl = bindTarget(target, weights.influences)
+        gvSkinCluster.write_skin_weights(skinCl, weights, targetShape)
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+    return skinCl
+
+
+def copySkinWeights(sources, target):
+    """
+        ### Copia o skin com o cmds.copySkinWeights (closestPoint, closestJoint) ###
+    """
+    sourceShapes = shapesQuery(sources)
+    targetShapes = shapesQuery(target)
+
+    sourceSkinClusters = skinClusterList(sourceShapes)
+    targetSkinClusters = skinClusterList(targetShapes)
+
+    if targetSkinClusters:
+        cmds.delete(targetSkinClusters)
+
+    influences = [ cmds.skinCluster(skinCl, query=True, inf=True) for skinCl in sourceSkinClusters ]
+    jnts = [ jnt for i in influences for jnt in i]
+
+    # uma vez cada joint, mesmo se estiver em varios skinClusters
+    uuids = cmds.ls(jnts, uuid=True) or []
+    seen = set()
+    jnts = [ jnt for jnt, uuid in zip(jnts, uuids) if not (uuid in seen or seen.add(uuid)) ]
+
+    if not jnts:
+        cmds.error("Nao foi encontrado joints na mesh target")
+        return
+
+    skinCl = cmds.skinCluster(jnts, target, tsb=1, ibp=1)[0]
+
+    cmds.select(clear=True)
+    for source in sources:
+        cmds.select(source, add=True)
+    cmds.select(target, add=True)
+    cmds.copySkinWeights(nm=1,sa="closestPoint", ia="closestJoint")
+
+    return skinCl
+
+
+def shapesQuery(selection):
+    """
+        ### retorna uma lista com todos os shapes de uma selecao ####
+    """
+    if isinstance(selection, list):
+        shapes = [cmds.listRelatives(s, shapes=True, fullPath=True, noIntermediate=True) for s in selection]
+    else:
+        shapes = cmds.listRelatives(selection, shapes=True, fullPath=True, noIntermediate=True)
+
+    return shapes
+
+
+def skinClusterList(shapes):
+    """
+        ### retorna uma lista com os skinClusters Node ####
+    """
+    skinClusters = []
+    for obj in shapes or []:
+        for shape in (obj if isinstance(obj, list) else [obj]):
+            # uma unica query por shape
+            connections = cmds.listConnections(shape, type='skinCluster')
+            if connections:
+                skinClusters.extend(connections)
+
+    return skinClusters
@@ -0,0 +1,595 @@
+"""
+#
+# # In-memory stand-in of maya.cmds for benchmarks outside Maya
+#
+# FakeScene models the DAG (parents, names, node types, UUIDs) with the
+# rename semantics of Maya: a name must be unique among its siblings and a
+# clash gets the next free trailing number. Nodes can be connected, and
+# arbitrary data (points, weights...) can be kept in FakeNode.attrs. FakeCmds
+# exposes the subset of maya.cmds used by the tools and counts every call.
+# FakeOpenMaya is the subset of maya.api.OpenMaya used by gvUndo (MDGModifier
+# renames and plug values), over the scene of a FakeCmds; FakeCmds loads
+# plugins and runs their commands with an undo stack (undo()).
+#
+"""
+import os
+import runpy
+import sys
+import tempfile
+import types
+import uuid as _uuid
+
+
+class FakeNode(object):
+    """
+    # # node of the fake scene
+    """
+    __slots__ = ('uuid', 'name', 'type', 'parent', 'children', 'readOnly', 'attrs')
+
+    def __init__(self, name, nodeType, parent=None, readOnly=False):
+        self.uuid = str(_uuid.uuid4()).upper()
+        self.name = name
+        self.type = nodeType
+        self.parent = parent
+        self.children = {}
+        self.readOnly = readOnly
+        self.attrs = {}
+
+    def longName(self):
+        path = []
+        node = self
+        while node is not None:
+            path.append(node.name)
+            node = node.parent
+        return '|' + '|'.join(reversed(path))
+
+
+class FakeScene(object):
+    """
+    # # DAG of FakeNodes. DG nodes (dag=False) live in their own namespace
+    """
+    def __init__(self):
+        self.world = {}
+        self.dgNodes = {}
+        self.byUUID = {}
+        self.byName = {}
+        self.selection = []
+        self.sceneName = ''
+
+    def __len__(self):
+        return len(self.byUUID)
+
+    def createNode(self, nodeType, name, parent=None, dag=True, readOnly=False):
+        """
+        :param parent: FakeNode or None
+        :return: FakeNode, with a unique name among its siblings
+        """
+        siblings = self._siblings(parent, dag)
+        node = FakeNode(unique_name(name, siblings), nodeType, parent, readOnly)
+        node.attrs['dag'] = dag
+
+        siblings[node.name] = node
+        self.byUUID[node.uuid] = node
+        self.byName.setdefault(node.name, set()).add(node)
+        return node
+
+    def rename(self, node, newName):
+        siblings = self._siblings(node.parent, node.attrs['dag'])
+        del siblings[node.name]
+        self.byName[node.name].discard(node)
+
+        node.name = unique_name(newName, siblings)
+        siblings[node.name] = node
+        self.byName.setdefault(node.name, set()).add(node)
+        return node.name
+
+    def find(self, name):
+        """
+        # # node of a long name, short name or UUID
+        """
+        node = self.byUUID.get(name)
+        if node is not None:
+            return node
+
+        path = name.lstrip('|').split('|')
+        if name.startswith('|'):
+            candidates = [n for n in self.byName.get(path[-1], ()) if n.longName() == name]
+        else:
+            candidates = [n for n in self.byName.get(path[-1], ()) if n.longName().endswith('|' + name)]
+
+        if not candidates:
+            raise ValueError('No object matches name: %s' % name)
+        if len(candidates) > 1:
+            raise ValueError('More than one object matches name: %s' % name)
+
+        return candidates[0]
+
+    def connect(self, source, destination):
+        """
+        # # connection between two FakeNodes, listed by listConnections on both
+        """
+        source.attrs.setdefault('connections', []).append(destination)
+        destination.attrs.setdefault('connections', []).append(source)
+
+    def delete(self, node):
+        for child in list(node.children.values()):
+            self.delete(child)
+        for other in node.attrs.get('connections', []):
+            other.attrs['connections'] = [n for n in other.attrs['connections'] if n is not node]
+
+        del self._siblings(node.parent, node.attrs['dag'])[node.name]
+        self.byName[node.name].discard(node)
+        del self.byUUID[node.uuid]
+        if node.uuid in self.selection:
+            self.selection.remove(node.uuid)
+
+    def nodes(self):
+        """
+        # # every node, parents before children
+        """
+        stack = list(reversed(list(self.world.values())))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(list(node.children.values())))
+
+        for node in self.dgNodes.values():
+            yield node
+
+    def _siblings(self, parent, dag):
+        if not dag:
+            return self.dgNodes
+        if parent is None:
+            return self.world
+        return parent.children
+
+
+class FakeCmds(object):
+    """
+    # # the subset of maya.cmds used by the tools, over a FakeScene
+    #
+    # self.calls counts every command by name.
+    """
+    def __init__(self, scene=None):
+        self.scene = scene if scene is not None else FakeScene()
+        self.calls = {}
+        self.undoChunks = 0
+        # undo steps: one per open chunk, one per edit outside a chunk
+        self.undoEntries = 0
+        self.chunkDepth = 0
+        # plugin commands by name, and the undoable ones that ran
+        self.plugins = set()
+        self.commands = {}
+        self.undoStack = []
+
+    def __getattr__(self, name):
+        commands = self.__dict__.get('commands', {})
+        if name not in commands:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._runCommand(name, args)
+
+    def resetCalls(self):
+        self.calls = {}
+
+    def totalCalls(self):
+        return sum(self.calls.values())
+
+    def _count(self, command):
+        self.calls[command] = self.calls.get(command, 0) + 1
+
+    def ls(self, *args, **kwargs):
+        self._count('ls')
+        scene = self.scene
+
+        if kwargs.get('selection') or kwargs.get('sl'):
+            nodes = [scene.find(n) for n in scene.selection]
+        elif args:
+            names = args[0]
+            if isinstance(names, (str, type(u''))):
+                names = [names]
+            nodes = []
+            for name in names:
+                # like maya, missing objects are left out
+                try:
+                    nodes.append(scene.find(name))
+                except ValueError:
+                    pass
+        else:
+            nodes = list(scene.nodes())
+
+        if args and (kwargs.get('dag') or kwargs.get('allDescendents')):
+            nodes = [d for n in nodes for d in _descendants(n)]
+        if kwargs.get('readOnly'):
+            nodes = [n for n in nodes if n.readOnly]
+        nodeType = kwargs.get('type')
+        if nodeType:
+            types = nodeType if isinstance(nodeType, (list, tuple)) else [nodeType]
+            nodes = [n for n in nodes if n.type in types]
+        if kwargs.get('noIntermediate') or kwargs.get('ni'):
+            nodes = [n for n in nodes if not n.attrs.get('intermediate')]
+        if kwargs.get('shapes'):
+            nodes = [n for n in nodes if n.type in SHAPE_TYPES]
+
+        if kwargs.get('uuid'):
+            return [n.uuid for n in nodes]
+
+        if kwargs.get('long') or kwargs.get('l'):
+            names = [n.longName() if n.attrs['dag'] else n.name for n in nodes]
+        else:
+            names = [n.name for n in nodes]
+
+        if kwargs.get('showType'):
+            return [value for name, n in zip(names, nodes) for value in (name, n.type)]
+
+        return names
+
+    def rename(self, old, new):
+        self._count('rename')
+        node = self.scene.find(old)
+        if node.readOnly:
+            raise RuntimeError("Cannot rename a read only node '%s'." % old)
+        return self.scene.rename(node, new)
+
+    def objExists(self, name):
+        self._count('objExists')
+        try:
+            self.scene.find(name)
+        except ValueError:
+            return False
+        return True
+
+    def objectType(self, name):
+        self._count('objectType')
+        return self.scene.find(name).type
+
+    def select(self, *args, **kwargs):
+        self._count('select')
+        if kwargs.get('clear'):
+            self.scene.selection = []
+            return
+        names = args[0] if args else []
+        if isinstance(names, (str, type(u''))):
+            names = [names]
+        if not kwargs.get('add'):
+            self.scene.selection = []
+        self.scene.selection.extend(names)
+
+    def listRelatives(self, names, shapes=False, children=False, parent=False, fullPath=False, **kwargs):
+        """
+        # # children or parent of the nodes, None when there is none (like maya)
+        """
+        self._count('listRelatives')
+        if isinstance(names, (str, type(u''))):
+            names = [names]
+
+        related = []
+        for name in names:
+            node = self.scene.find(name)
+            if parent:
+                related.extend([node.parent] if node.parent is not None else [])
+            else:
+                nodes = list(node.children.values())
+                if shapes:
+                    nodes = [n for n in nodes if n.type in SHAPE_TYPES]
+                if kwargs.get('noIntermediate') or kwargs.get('ni'):
+                    nodes = [n for n in nodes if not n.attrs.get('intermediate')]
+                related.extend(nodes)
+
+        if not related:
+            return None
+        return [n.longName() if fullPath else n.name for n in related]
+
+    def listConnections(self, name, type=None, **kwargs):
+        self._count('listConnections')
+        nodes = self.scene.find(name).attrs.get('connections', [])
+        if type:
+            nodes = [n for n in nodes if n.type == type]
+        if not nodes:
+            return None
+        return [n.longName() if n.attrs['dag'] else n.name for n in nodes]
+
+    def delete(self, names):
+        self._count('delete')
+        if isinstance(names, (str, type(u''))):
+            names = [names]
+        for node in [self.scene.find(name) for name in names]:
+            self.scene.delete(node)
+
+    def skinCluster(self, *args, **kwargs):
+        """
+        # # bind: skinCluster(influences, target, tsb=1, ibp=1) -> [name]
+        """
+        self._count('skinCluster')
+        influences, target = args[:-1], args[-1]
+        if len(influences) == 1 and isinstance(influences[0], (list, tuple)):
+            influences = influences[0]
+
+        shapes = [n for n in self.scene.find(target).children.values() if n.type in SHAPE_TYPES]
+        if not shapes:
+            raise RuntimeError('%s has no shape to bind' % target)
+
+        node = self.scene.createNode('skinCluster', 'skinCluster1', dag=False)
+        node.attrs['influences'] = [self.scene.find(name).longName() for name in influences]
+        self.scene.connect(node, shapes[0])
+        return [node.name]
+
+    def setAttr(self, plug, *values, **kwargs):
+        self._count('setAttr')
+        name, attribute = plug.split('.', 1)
+        self.scene.find(name).attrs[attribute] = values[0] if len(values) == 1 else tuple(values)
+        if not self.chunkDepth:
+            self.undoEntries += 1
+
+    def getAttr(self, plug):
+        self._count('getAttr')
+        name, attribute = plug.split('.', 1)
+        return self.scene.find(name).attrs.get(attribute)
+
+    def undoInfo(self, *args, **kwargs):
+        self._count('undoInfo')
+        if kwargs.get('openChunk'):
+            self.undoChunks += 1
+            if not self.chunkDepth:
+                self.undoEntries += 1
+            self.chunkDepth += 1
+        elif kwargs.get('closeChunk'):
+            self.chunkDepth = max(self.chunkDepth - 1, 0)
+
+    def loadPlugin(self, path, quiet=False):
+        self._count('loadPlugin')
+        if path not in self.plugins:
+            runpy.run_path(path)['initializePlugin'](self)
+            self.plugins.add(path)
+
+    def pluginInfo(self, path, query=False, loaded=False):
+        self._count('pluginInfo')
+        return path in self.plugins
+
+    def _runCommand(self, name, args):
+        self._count(name)
+        command = self.commands[name]()
+        command.doIt(args)
+        if command.isUndoable():
+            self.undoStack.append(command)
+            if not self.chunkDepth:
+                self.undoEntries += 1
+
+    def undo(self):
+        """
+        # # undo the last plugin command, the other commands are not in the stack
+        """
+        self._count('undo')
+        if self.undoStack:
+            self.undoStack.pop().undoIt()
+
+    def file(self, *args, **kwargs):
+        self._count('file')
+        if kwargs.get('sceneName') or kwargs.get('sn'):
+            return self.scene.sceneName
+
+    def internalVar(self, **kwargs):
+        self._count('internalVar')
+        return os.path.join(tempfile.gettempdir(), 'gvFakeMaya') + '/'
+
+    def warning(self, *args):
+        self._count('warning')
+
+    def error(self, message):
+        self._count('error')
+        raise RuntimeError(message)
+
+
+class FakeOpenMaya(object):
+    """
+    #
+    # # stand-in of maya.api.OpenMaya over the scene of a FakeCmds
+    #
+    # MObjects are the FakeNodes. Every modifier operation and doIt is counted
+    # in the calls of the FakeCmds, as 'api.<name>'.
+    #
+    """
+    def __init__(self, cmds):
+        self.cmds = cmds
+        api = self
+
+        class MSelectionList(object):
+            def __init__(self):
+                self.nodes = []
+                self.members = set()
+
+            def add(self, name):
+                node = api.cmds.scene.find(name)
+                if node not in self.members:
+                    self.members.add(node)
+                    self.nodes.append(node)
+
+            def length(self):
+                return len(self.nodes)
+
+            def getDependNode(self, index):
+                return self.nodes[index]
+
+        class MPlug(object):
+            def __init__(self, node, attribute, index=None):
+                self.node = node
+                self.attribute = attribute
+                self.index = index
+
+            def child(self, index):
+                return MPlug(self.node, self.attribute, index)
+
+            def value(self):
+                return self.node.attrs.get(self.attribute)
+
+            def setValue(self, value):
+                if self.index is None:
+                    self.node.attrs[self.attribute] = value
+                    return
+                values = list(self.node.attrs.get(self.attribute) or (0.0, 0.0, 0.0))
+                values[self.index] = value
+                self.node.attrs[self.attribute] = tuple(values)
+
+            def childValue(self):
+                values = self.node.attrs.get(self.attribute)
+                return 0.0 if values is None else values[self.index]
+
+        class MFnDependencyNode(object):
+            def __init__(self, node):
+                self.node = node
+
+            def name(self):
+                return self.node.name
+
+            def findPlug(self, attribute, wantNetworkedPlug):
+                return MPlug(self.node, attribute)
+
+        class MDGModifier(object):
+            def __init__(self):
+                # (do, undo) functions, the first self.done already done
+                self.operations = []
+                self.done = 0
+
+            def renameNode(self, node, name):
+                api._count('renameNode')
+                old = []
+
+                def do():
+                    old.append(node.name)
+                    api.cmds.scene.rename(node, name)
+
+                def undo():
+                    api.cmds.scene.rename(node, old.pop())
+
+                self.operations.append((do, undo))
+
+            def _newPlugValue(self, plug, value):
+                api._count('newPlugValue')
+                old = []
+
+                def do():
+                    old.append(plug.value() if plug.index is None else plug.childValue())
+                    plug.setValue(value)
+
+                def undo():
+                    plug.setValue(old.pop())
+
+                self.operations.append((do, undo))
+
+            newPlugValueFloat = newPlugValueInt = newPlugValueBool = _newPlugValue
+
+            def doIt(self):
+                api._count('MDGModifier.doIt')
+                for do, undo in self.operations[self.done:]:
+                    do()
+                self.done = len(self.operations)
+
+            def undoIt(self):
+                api._count('MDGModifier.undoIt')
+                for do, undo in reversed(self.operations[:self.done]):
+                    undo()
+                self.done = 0
+
+        class MPxCommand(object):
+            def __init__(self):
+                pass
+
+        class MFnPlugin(object):
+            def __init__(self, plugin, vendor='', version=''):
+                self.plugin = plugin
+
+            def registerCommand(self, name, creator):
+                self.plugin.commands[name] = creator
+
+            def deregisterCommand(self, name):
+                del self.plugin.commands[name]
+
+        self.MSelectionList = MSelectionList
+        self.MPlug = MPlug
+        self.MFnDependencyNode = MFnDependencyNode
+        self.MDGModifier = MDGModifier
+        self.MPxCommand = MPxCommand
+        self.MFnPlugin = MFnPlugin
+
+    def _count(self, name):
+        self.cmds._count('api.' + name)
+
+
+def _descendants(node):
+    """
+    # # node and every node below it, parents first
+    """
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(reversed(list(node.children.values())))
+
+
+# node types listed by listRelatives(shapes=True)
+SHAPE_TYPES = ('mesh', 'nurbsCurve', 'nurbsSurface')
+
+
+def unique_name(name, siblings):
+    """
+    # # maya clash rule: ctrl -> ctrl1, ctrl1 -> ctrl2...
+    """
+    if name not in siblings:
+        return name
+
+    base = name.rstrip('0123456789')
+    num = int(name[len(base):] or 0) + 1
+    while '%s%d' % (base, num) in siblings:
+        num += 1
+
+    return '%s%d' % (base, num)
+
+
+def build_chains(count, depth=10, nodeType='joint', name='jnt'):
+    """
+    #
+    # # scene of joint chains, count nodes in total, depth nodes per chain
+    #
+    :return: FakeCmds with every node selected, in creation order
+    """
+    cmds = FakeCmds()
+    scene = cmds.scene
+
+    parent = None
+    for i in range(count):
+        if i % depth == 0:
+            parent = None
+        parent = scene.createNode(nodeType, '%s%d' % (name, i), parent=parent)
+        scene.selection.append(parent.uuid)
+
+    return cmds
+
+
+def install():
+    """
+    #
+    # # register fake maya / maya.cmds modules when Maya is not available,
+    # # so the tools can be imported by the benchmarks
+    #
+    # maya.api.OpenMaya and maya.api.OpenMayaAnim are registered empty, only
+    # so that the modules importing them load: the benchmarks replace the
+    # API users (gvSkinCluster) by their own fakes.
+    #
+    :return: True if the fake modules were installed
+    """
+    try:
+        import maya.cmds
+        return False
+    except ImportError:
+        pass
+
+    maya = types.ModuleType('maya')
+    maya.cmds = FakeCmds()
+    maya.api = types.ModuleType('maya.api')
+    maya.api.OpenMaya = types.ModuleType('maya.api.OpenMaya')
+    maya.api.OpenMayaAnim = types.ModuleType('maya.api.OpenMayaAnim')
+    sys.modules['maya'] = maya
+    sys.modules['maya.cmds'] = maya.cmds
+    sys.modules['maya.api'] = maya.api
+    sys.modules['maya.api.OpenMaya'] = maya.api.OpenMaya
+    sys.modules['maya.api.OpenMayaAnim'] = maya.api.OpenMayaAnim
+    return True
@@ -0,0 +1,343 @@
+"""
+#
+# # Rename templates: a pattern is compiled once into a reusable formatter
+#
+# Fields of a template:
+#     <num>, <num><num>...  number, padded to the amount of <num>
+#     <str>, <str><str>...  letters (A, B... AA), at least the amount of <str>
+#     <num:pad:start:step>  number with explicit padding, start and step (any part may be empty)
+#     <str:pad:start:step>  letters, start is an index (0 = A...) or a label
+#     ###, @@@              same as <num><num><num> and <str><str><str>
+# Tokens, filled from the node being renamed:
+#     {name} {parent} {type} {side}
+#
+"""
+import re
+import string
+from collections import OrderedDict
+from itertools import count
+
+
+ALPHABET = string.ascii_uppercase
+
+TOKENS = ('name', 'parent', 'type', 'side')
+
+NUM = 'num'
+STR = 'str'
+
+_FIELD_RE = re.compile(r'(?P<num>(?:<num>)+)'
+                       r'|(?P<str>(?:<str>)+)'
+                       r'|<(?P<kind>num|str):(?P<opts>[^>]*)>'
+                       r'|(?P<hash>#+)'
+                       r'|(?P<at>@+)'
+                       r'|\{(?P<token>\w+)\}')
+
+_SIDE_RE = re.compile(r'(?:^|_)([LRC])(?:_|$)')
+
+# compiled templates of the last patterns, the live preview compiles every
+# partial pattern typed
+CACHE_SIZE = 64
+_cache = OrderedDict()
+
+
+class TemplateField(object):
+    """
+    # # one <num> or <str> field of a template
+    """
+    def __init__(self, kind, pad=1, start=None, step=1):
+        self.kind = kind
+        self.pad = pad
+        self.start = (1 if kind == NUM else 0) if start is None else start
+        self.step = step
+
+    def __repr__(self):
+        return '<%s:%d:%d:%d>' % (self.kind, self.pad, self.start, self.step)
+
+    def value(self, index):
+        """
+        :param index: position of the object in the sequence of this field, from 0
+        :return: formatted number or label
+        """
+        value = self.start + index * self.step
+        if self.kind == NUM:
+            return '%0*d' % (self.pad, value)
+        return index_to_label(value, self.pad)
+
+
+class NameTemplate(object):
+    """
+    # # compiled rename template, use compile_template to get one
+    """
+    def __init__(self, pattern):
+        """
+        :param pattern: template string, see the module doc
+        """
+        self.pattern = pattern
+        self.fields = []
+        self.tokens = []
+
+        # the pattern becomes a str.format string: {0}, {1}... are the fields
+        parts = []
+        end = 0
+        for match in _FIELD_RE.finditer(pattern):
+            parts.append(_escape(pattern[end:match.start()]))
+            end = match.end()
+
+            token = match.group('token')
+            if token:
+                if token not in TOKENS:
+                    raise ValueError('unknown token {%s} in %r' % (token, pattern))
+                if token not in self.tokens:
+                    self.tokens.append(token)
+                parts.append('{%s}' % token)
+                continue
+
+            parts.append('{%d}' % len(self.fields))
+            self.fields.append(_parse_field(match))
+
+        parts.append(_escape(pattern[end:]))
+        self._format = ''.join(parts).format
+
+    def __repr__(self):
+        return 'NameTemplate(%r)' % self.pattern
+
+    def kinds(self):
+        """
+        :return: list with the kind (num/str) of every field, in order
+        """
+        return [field.kind for field in self.fields]
+
+    def format(self, indices=(), context=None):
+        """
+        #
+        # # new name from the index of each field and the node tokens
+        #
+        :param indices: one index per field, from 0
+        :param context: dict with the values of the tokens used by the template
+        :return: new name
+        """
+        values = [field.value(index) for field, index in zip(self.fields, indices)]
+        if context:
+            return self._format(*values, **context)
+        return self._format(*values)
+
+    def name(self, index, context=None):
+        """
+        # # name of the object number index, every field advances together
+        """
+        return self.format((index,) * len(self.fields), context)
+
+    def names(self, lenSel, contexts=None):
+        """
+        #
+        # # names for lenSel objects, every field advances together
+        #
+        :param lenSel: amount of objects
+        :param contexts: list of token dicts, one per object (only if the template has tokens)
+        :return: list of new names
+        """
+        if contexts:
+            return [self.name(i, contexts[i]) for i in range(lenSel)]
+        return [self.name(i) for i in range(lenSel)]
+
+    def sequence(self, lenSel, radices, digits, contexts=None):
+        """
+        #
+        # # names for lenSel objects, the fields driven by an odometer
+        #
+        # Example: '<str>_<num>' with radices (None, 2) and digits (0, 1) gives
+        # A_1, A_2, B_1, B_2, C_1... whatever the order of the fields.
+        #
+        :param lenSel: amount of objects
+        :param radices: radix of every odometer digit, slowest first
+        :param digits: odometer digit driving each field
+        :param contexts: list of token dicts, one per object
+        :return: list of new names (shorter than lenSel if the odometer ends)
+        """
+        names = []
+        counter = odometer(radices)
+        for i in range(lenSel):
+            state = next(counter, None)
+            if state is None:
+                break
+            indices = [state[digit] for digit in digits]
+            names.append(self.format(indices, contexts[i] if contexts else None))
+        return names
+
+
+def odometer(radices):
+    """
+    #
+    # # n-dimensional counter: (0, 0), (0, 1)... (0, r-1), (1, 0)...
+    #
+    # The last digit is the fastest. A radix None never carries (only useful
+    # for the first digit). Each step is O(1) amortized, no generator is
+    # rebuilt when a digit wraps.
+    #
+    :param radices: radix of every digit, slowest first
+    :return: generator of tuples of digits
+    """
+    digits = [0] * len(radices)
+    last = len(digits) - 1
+    while True:
+        yield tuple(digits)
+
+        i = last
+        while i >= 0:
+            digits[i] += 1
+            if radices[i] is None or digits[i] < radices[i]:
+                break
+            digits[i] = 0
+            i -= 1
+        else:
+            # every digit wrapped
+            return
+
+
+def compile_template(pattern):
+    """
+    #
+    # # compiled template of a pattern, the last CACHE_SIZE patterns are cached
+    #
+    :param pattern: template string
+    :return: NameTemplate
+    """
+    template = _cache.pop(pattern, None)
+    if template is None:
+        template = NameTemplate(pattern)
+        if len(_cache) >= CACHE_SIZE:
+            _cache.popitem(last=False)
+    _cache[pattern] = template
+    return template
+
+
+def node_context(longName, nodeType=''):
+    """
+    #
+    # # values of the template tokens for one node
+    #
+    :param longName: long name of the node
+    :param nodeType: type of the node, if the template uses {type}
+    :return: dict
+    """
+    path = longName.split('|')
+    name = path[-1]
+    side = _SIDE_RE.search(name.rsplit(':', 1)[-1])
+
+    return {'name'   : name,
+            'parent' : path[-2] if len(path) > 2 else '',
+            'type'   : nodeType,
+            'side'   : side.group(1) if side else ''}
+
+
+def label_capacity(decimalPlaces):
+    """
+    # # amount of distinct labels with exactly decimalPlaces letters
+    """
+    return len(ALPHABET) ** decimalPlaces
+
+
+def index_to_label(index, decimalPlaces=1):
+    """
+    #
+    # # label of the item number index of the letters sequence
+    #
+    # Bijective base-26 starting at decimalPlaces letters: with 2 places, 0 -> AA,
+    # 1 -> AB, 26 -> BA, 675 -> ZZ, 676 -> AAA. With 1 place it is the
+    # spreadsheet column sequence A... Z, AA...
+    #
+    :param index: position in the sequence, from 0
+    :param decimalPlaces: minimum amount of letters
+    :return: label
+    """
+    if index < 0:
+        raise ValueError('negative label index %d' % index)
+
+    base = len(ALPHABET)
+
+    # skip the blocks of shorter labels
+    width = decimalPlaces
+    block = base ** width
+    while index >= block:
+        index -= block
+        width += 1
+        block *= base
+
+    letters = []
+    for i in range(width):
+        index, digit = divmod(index, base)
+        letters.append(ALPHABET[digit])
+
+    return ''.join(reversed(letters))
+
+
+def label_to_index(label, decimalPlaces=1):
+    """
+    #
+    # # inverse of index_to_label
+    #
+    :param label: upper case label
+    :param decimalPlaces: minimum amount of letters of the sequence
+    :return: position in the sequence, from 0
+    """
+    width = len(label)
+    if width < decimalPlaces or label.strip(ALPHABET):
+        raise ValueError('%r is not a label of %d letters or more' % (label, decimalPlaces))
+
+    base = len(ALPHABET)
+    value = 0
+    for letter in label:
+        value = value * base + ord(letter) - ord(ALPHABET[0])
+
+    # labels shorter than this one come first
+    return value + (base ** width - base ** decimalPlaces) // (base - 1)
+
+
+def letters_constructor(decimalPlaces=2):
+    """
+    #
+    # # generator letter combinations: AA, AB... AZ, BA... ZZ, AAA...
+    #
+    # Never runs out: after the last label of decimalPlaces letters it goes on
+    # with one letter more, so no name is ever repeated.
+    #
+    :param decimalPlaces: amount of decimal places
+    :return: letters combination
+    """
+    for index in count():
+        # yield letter sequence
+        yield index_to_label(index, decimalPlaces)
+
+
+def _escape(literal):
+    return literal.replace('{', '{{').replace('}', '}}')
+
+
+def _parse_field(match):
+    """
+    # # TemplateField of a regex match of _FIELD_RE
+    """
+    if match.group('num'):
+        return TemplateField(NUM, pad=match.group('num').count('<'))
+    if match.group('str'):
+        return TemplateField(STR, pad=match.group('str').count('<'))
+    if match.group('hash'):
+        return TemplateField(NUM, pad=len(match.group('hash')))
+    if match.group('at'):
+        return TemplateField(STR, pad=len(match.group('at')))
+
+    kind = match.group('kind')
+    opts = (match.group('opts').split(':') + ['', '', ''])[:3]
+    pad = int(opts[0]) if opts[0] else 1
+    step = int(opts[2]) if opts[2] else 1
+
+    start = opts[1] or None
+    if start is not None:
+        if start.lstrip('-').isdigit():
+            start = int(start)
+        elif kind == STR:
+            start = label_to_index(start.upper(), pad)
+        else:
+            raise ValueError('invalid start %r for <num>' % start)
+
+    return TemplateField(kind, pad=pad, start=start, step=step)
@@ -0,0 +1,126 @@
+"""
+#
+# # Rename benchmarks over the in-memory maya scene of gvFakeMaya
+#
+# Times RENAMER (plan + apply) in the numeric, alphabetical and mixed modes,
+# the plan alone (dryRun) and the label sequence used by renamer()/gen_letters,
+# and records the amount of backend calls of each run.
+#
+#     mayapy gvRenameBenchmark.py --sizes 1000 10000 100000 --json rename.json
+#
+"""
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+from timeit import default_timer as timer
+
+import gvFakeMaya
+gvFakeMaya.install()
+
+import gvRenamer
+from gvNameTemplate import index_to_label
+
+
+SIZES = (1000, 10000, 100000)
+
+# mode: (modelName, numFrequency)
+MODES = {'numeric'      : ('jnt_<num><num><num>_bind', 3),
+         'alphabetical' : ('jnt_<str><str>_bind', 3),
+         'mixed'        : ('arm_<str>_seg_<num><num>_jnt', 4)}
+
+
+def bench_renamer(size, mode, dryRun=False, depth=10):
+    """
+    #
+    # # time one RENAMER run over a scene of size selected joints
+    #
+    :param size: amount of nodes
+    :param mode: key of MODES
+    :param dryRun: only plan
+    :param depth: joints per chain
+    :return: dict with the results
+    """
+    modelName, numFrequency = MODES[mode]
+
+    cmds = gvFakeMaya.build_chains(size, depth=depth)
+    gvRenamer.cmds = cmds
+
+    start = timer()
+    renamer = gvRenamer.RENAMER(modelName=modelName, numFrequency=numFrequency, dryRun=dryRun)
+    seconds = timer() - start
+
+    return {'bench'          : 'plan' if dryRun else 'rename',
+            'mode'           : mode,
+            'size'           : size,
+            'planned'        : len(renamer.plan),
+            'seconds'        : seconds,
+            'nodesPerSecond' : size / seconds if seconds else 0.0,
+            'calls'          : dict(cmds.calls),
+            'totalCalls'     : cmds.totalCalls(),
+            'undoChunks'     : cmds.undoChunks,
+            'undoEntries'    : cmds.undoEntries}
+
+
+def bench_labels(size, decimalPlaces=2):
+    """
+    # # time the label sequence of renamer() for size objects
+    """
+    start = timer()
+    labels = [index_to_label(i, decimalPlaces) for i in range(size)]
+    seconds = timer() - start
+
+    return {'bench'          : 'labels',
+            'mode'           : 'alphabetical',
+            'size'           : size,
+            'planned'        : len(set(labels)),
+            'seconds'        : seconds,
+            'nodesPerSecond' : size / seconds if seconds else 0.0,
+            'calls'          : {},
+            'totalCalls'     : 0,
+            'undoChunks'     : 0,
+            'undoEntries'    : 0}
+
+
+def run(sizes=SIZES, modes=None):
+    """
+    #
+    # # run every benchmark for every size
+    #
+    :return: list of result dicts
+    """
+    results = []
+    for size in sizes:
+        for mode in sorted(modes or MODES):
+            results.append(bench_renamer(size, mode, dryRun=True))
+            results.append(bench_renamer(size, mode))
+        results.append(bench_labels(size))
+    return results
+
+
+def report(results, stream=sys.stdout):
+    line = '{:<8}{:<14}{:>8}{:>10}{:>12}{:>14}{:>8}'
+    print(line.format('bench', 'mode', 'size', 'seconds', 'nodes/s', 'backendCalls', 'undo'), file=stream)
+    for r in results:
+        print(line.format(r['bench'], r['mode'], r['size'], '%.3f' % r['seconds'],
+                          '%d' % r['nodesPerSecond'], r['totalCalls'], r['undoEntries']), file=stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gvRenamer benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--modes', nargs='+', choices=sorted(MODES))
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.modes)
+    report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
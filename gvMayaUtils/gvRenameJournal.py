@@ -0,0 +1,106 @@
+"""
+#
+# # Rollback journal of the batch renames
+#
+# Before a batch rename starts, the whole plan (uuid, old name, new name) is
+# written to one small file. The file is removed when the batch ends (renamed
+# or rolled back), so a journal left on disk means the session died in the
+# middle of a rename and can be reverted on the next launch.
+#
+"""
+import glob
+import json
+import os
+import time
+
+
+EXTENSION = '.renameJournal'
+
+
+class RenameJournal(object):
+    """
+    # # journal of one batch rename
+    """
+    def __init__(self, path, scene='', entries=None, created=None):
+        """
+        :param path: journal file
+        :param scene: scene file the batch was applied to
+        :param entries: list of (uuid, oldName, newName)
+        :param created: creation time (seconds since epoch)
+        """
+        self.path = path
+        self.scene = scene
+        self.entries = list(entries) if entries else []
+        self.created = created if created is not None else time.time()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return 'RenameJournal(%r, %d entries)' % (self.path, len(self.entries))
+
+    @classmethod
+    def create(cls, directory, scene, entries):
+        """
+        #
+        # # write a new journal to disk, before the renames start
+        #
+        :param directory: folder of the journals, created if needed
+        :param scene: scene file the batch is applied to
+        :param entries: iterable of (uuid, oldName, newName)
+        :return: RenameJournal
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        path = os.path.join(directory, 'rename_%d_%d%s' % (os.getpid(), int(time.time() * 1000), EXTENSION))
+        journal = cls(path, scene, entries)
+        journal.write()
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(path, data.get('scene', ''), [tuple(e) for e in data.get('entries', [])], data.get('created'))
+
+    def write(self):
+        data = {'scene': self.scene, 'created': self.created, 'entries': self.entries}
+        with open(self.path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        """
+        # # the batch is over, remove the file
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def undoEntries(self, count=None):
+        """
+        # # entries to revert, last renamed first
+        :param count: only the first count entries were renamed
+        :return: list of (uuid, oldName, newName)
+        """
+        entries = self.entries if count is None else self.entries[:count]
+        return list(reversed(entries))
+
+
+def pending_journals(directory):
+    """
+    #
+    # # journals left on disk by an interrupted batch, oldest first
+    #
+    :param directory: folder of the journals
+    :return: list of RenameJournal
+    """
+    journals = []
+    for path in glob.glob(os.path.join(directory, '*' + EXTENSION)):
+        try:
+            journals.append(RenameJournal.load(path))
+        except (IOError, OSError, ValueError):
+            continue
+
+    return sorted(journals, key=lambda journal: journal.created)
@@ -0,0 +1,289 @@
+"""
+#
+# # Rename planner: compute the whole old -> new mapping in pure python
+# # before touching the scene. No maya import, so it runs outside Maya.
+#
+"""
+import re
+import string
+
+from gvNameTemplate import STR, compile_template, letters_constructor
+
+
+class RenamePlan(object):
+    """
+    # # Ordered list of (oldName, newName) pairs of one rename operation
+    """
+    def __init__(self, entries=None):
+        """
+        :param entries: iterable of (oldName, newName) tuples
+        """
+        self.entries = list(entries) if entries else []
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return 'RenamePlan(%d entries)' % len(self.entries)
+
+    def mapping(self):
+        """
+        :return: dict oldName -> newName
+        """
+        return dict(self.entries)
+
+    def oldNames(self):
+        return [old for old, new in self.entries]
+
+    def newNames(self):
+        return [new for old, new in self.entries]
+
+    def changed(self):
+        """
+        # # entries whose short name really changes (skips no-op renames)
+        :return: list of (oldName, newName)
+        """
+        return [(old, new) for old, new in self.entries if short_name(old) != new]
+
+
+def short_name(longName):
+    """
+    # # short name of a long DAG path (|grp|ctrl -> ctrl)
+    :param longName: long or short node name
+    :return: last path component
+    """
+    return longName.rsplit('|', 1)[-1]
+
+
+class NameIndex(object):
+    """
+    # # Index of the short names used in the scene, built once per operation
+    # # from a single bulk ls. Lookups and updates are O(1)
+    """
+    def __init__(self, names=()):
+        """
+        :param names: iterable of node names (long or short)
+        """
+        self.counts = {}
+        for name in names:
+            self.add(name)
+
+    def __contains__(self, name):
+        return self.counts.get(short_name(name), 0) > 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, name):
+        name = short_name(name)
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def discard(self, name):
+        name = short_name(name)
+        count = self.counts.get(name, 0)
+        if count > 1:
+            self.counts[name] = count - 1
+        elif count:
+            del self.counts[name]
+
+    def copy(self):
+        index = NameIndex()
+        index.counts = dict(self.counts)
+        return index
+
+    def unique_name(self, name):
+        """
+        # # first free name following the maya convention (ctrl -> ctrl1, ctrl2...)
+        :param name: wanted short name
+        :return: free short name
+        """
+        if name not in self:
+            return name
+
+        base = name.rstrip(string.digits)
+        num = int(name[len(base):] or 0) + 1
+        while '%s%d' % (base, num) in self:
+            num += 1
+
+        return '%s%d' % (base, num)
+
+
+def path_depth(longName):
+    """
+    # # depth of a long DAG path (|grp|ctrl -> 2), 0 for DG nodes
+    """
+    return longName.count('|')
+
+
+def build_plan(oldNames, newNames, deepestFirst=True):
+    """
+    #
+    # # pair the objects with the new names
+    #
+    # Renaming a parent changes the long path of all its descendants, so by
+    # default the entries are ordered deepest-first: every long name stays valid
+    # until its own rename. The sort is stable, siblings keep their order.
+    #
+    :param oldNames: list of objects (long names)
+    :param newNames: list or generator of new names, at least len(oldNames) items
+    :param deepestFirst: order the entries so children are renamed before parents
+    :return: RenamePlan
+    """
+    newNames = list(newNames)
+    if len(newNames) < len(oldNames):
+        raise ValueError('%d names for %d objects' % (len(newNames), len(oldNames)))
+
+    entries = list(zip(oldNames, newNames))
+    if deepestFirst:
+        entries.sort(key=lambda entry: path_depth(entry[0]), reverse=True)
+
+    return RenamePlan(entries)
+
+
+def find_conflicts(plan, index, resolve=False):
+    """
+    #
+    # # check every planned name against the scene and the rest of the plan
+    #
+    # The renames are simulated in plan order over a copy of the index: the old
+    # name of a renamed node is freed, the new one is taken. A planned name
+    # clashes if another node still holds it at that point.
+    #
+    :param plan: RenamePlan
+    :param index: NameIndex of the scene
+    :param resolve: if True, clashing names are replaced by the next free name
+    :return: (RenamePlan, list of (oldName, wantedName) conflicts)
+    """
+    index = index.copy()
+    entries = []
+    conflicts = []
+    for old, new in plan:
+        if short_name(old) != new:
+            if new in index:
+                conflicts.append((old, new))
+                if resolve:
+                    new = index.unique_name(new)
+            index.discard(old)
+            index.add(new)
+        entries.append((old, new))
+
+    return RenamePlan(entries), conflicts
+
+
+def resolve_conflicts(plan, index):
+    """
+    # # plan where every clashing name is replaced by the next free name
+    :return: (RenamePlan, list of (oldName, wantedName) conflicts)
+    """
+    return find_conflicts(plan, index, resolve=True)
+
+
+def replace_names(longNames, search, replace, regex=False, ignoreCase=False, stats=None):
+    """
+    #
+    # # streaming search/replace over node names
+    #
+    # Lazy generator: names are filtered by one precompiled regex and only the
+    # nodes whose short name really changes are yielded. The namespace part of
+    # the name is never touched.
+    #
+    :param longNames: iterable of long names, e.g. a cmds.ls(long=True) snapshot
+    :param search: text to search, or regex if regex is True
+    :param replace: replacement text (may use \\1 groups with regex)
+    :param regex: search is a regular expression
+    :param ignoreCase: case insensitive search
+    :param stats: dict updated with the counters 'scanned' and 'matched'
+    :return: generator of (longName, newName)
+    """
+    flags = re.IGNORECASE if ignoreCase else 0
+    pattern = re.compile(search if regex else re.escape(search), flags)
+    if not regex:
+        replace = replace.replace('\\', '\\\\')
+
+    if stats is None:
+        stats = {}
+    stats.setdefault('scanned', 0)
+    stats.setdefault('matched', 0)
+
+    subn = pattern.subn
+    for longName in longNames:
+        stats['scanned'] += 1
+
+        namespace, sep, name = short_name(longName).rpartition(':')
+        newName, count = subn(replace, name)
+        if not count:
+            continue
+
+        stats['matched'] += 1
+        if newName != name:
+            yield longName, namespace + sep + newName
+
+
+def plan_names(modelName, lenSel, numFrequency=3, contexts=None):
+    """
+    #
+    # # list of new names for lenSel objects following modelName
+    #
+    :param modelName: pattern of name, see gvRenamer.RENAMER and gvNameTemplate
+    :param lenSel: amount of objects
+    :param numFrequency: how often the <str> is passed to next in mixed patterns
+    :param contexts: token dicts of the objects (gvNameTemplate.node_context), if the pattern has tokens
+    :return: list of new names (empty if the pattern is inconsistent)
+    """
+    template = compile_template(modelName)
+    kinds = template.kinds()
+    if not kinds:
+        return []
+
+    # only string pattern or only number pattern
+    if len(set(kinds)) == 1:
+        return template.names(lenSel, contexts)
+
+    # string and number pattern, in any order: one odometer where every <str>
+    # is the slow digit and every <num> cycles 1..numFrequency
+    digits = [0 if kind == STR else 1 for kind in kinds]
+    return template.sequence(lenSel, (None, numFrequency), digits, contexts)
+
+
+def numeric_constructor(prefix, suffix, decimalPlaces, lenSel):
+    """
+    #
+    # # numeric name generator
+    #
+    :param prefix: preffix of new name
+    :param suffix: suffix of new name
+    :param decimalPlaces: amount of decimal places
+    :param lenSel: amount of selection list
+    :return: new name
+    """
+    lenSel += 1
+    num = 1
+    while num < lenSel:
+        # yield new name
+        yield '{}{:0{}d}{}'.format(prefix, num, decimalPlaces, suffix)
+        num +=1
+
+
+def alphabetical_constructor(prefix, suffix, decimalPlaces=2, lenSel=0):
+    """
+    #
+    # # alphabetical name generator
+    #
+    :param prefix: preffix of new name
+    :param suffix: suffix of new name
+    :param decimalPlaces: amount of decimal places
+    :param lenSel: amount of selection list
+    :return: new name
+    """
+
+    # instance of the function letters_constructor
+    alphabetSequence = letters_constructor(decimalPlaces)
+
+    num = 0
+    while num < lenSel:
+        # yield new name
+        yield '{}{}{}'.format(prefix, next(alphabetSequence), suffix)
+        num +=1
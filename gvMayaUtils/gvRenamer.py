@@ -3,21 +3,34 @@
 # # Renamer Maya objects with suffix numeric or alphabetic
 #
 """
+import os
+
 try:
     import maya.cmds as cmds
-    import pymel.core as pm
-    import re
-    import string
-    from itertools import combinations_with_replacement as cwr
 except Exception as e:
     cmds.error(e)
 
+from gvRenamePlan import (NameIndex,
+                          build_plan,
+                          find_conflicts,
+                          replace_names,
+                          plan_names,
+                          short_name)
+from gvNameTemplate import compile_template, node_context
+from gvRenameJournal import RenameJournal, pending_journals
+import gvUndo
+from gvTaskRunner import Progress, run_task
+
+
+# renames per slice of apply_plan_steps
+RENAME_BATCH = 500
+
 
 class RENAMER(object):
     """
     # # Class for rename object list
     """
-    def __init__(self, oldNames=None, modelName=None, numFrequency = 3):
+    def __init__(self, oldNames=None, modelName=None, numFrequency = 3, dryRun=False, onConflict='resolve'):
         """
         #
         ## __init__ method of the renamer class
@@ -35,185 +48,295 @@ class RENAMER(object):
                                      Result: prefix_A_middle_1_suffix, prefix_A_middle_2_suffix
                                              prefix_B_middle_1_suffix, prefix_B_middle_2_suffix
                                              prefix_C_middle_1_suffix
+                            The fields may come in any order and amount ('<num>_<str>_x' works too)
 
+                          Any template of gvNameTemplate is accepted, e.g. '{side}_arm_<num:2:10:10>_jnt'
+
+        :param dryRun: only build self.plan, the scene is not changed
+
+        :param onConflict: what to do when a new name already exists in the scene or in the plan
+                           'resolve' - use the next free name (ctrl -> ctrl1), decided up front
+                           'error'   - raise RuntimeError before renaming anything
+                           'ignore'  - let maya solve it while renaming
         """
 
         self.objectsList = []
         if not oldNames:
             # get list of selected objects
-            self.objectsList = get_selection()
+            self.objectsList = get_selection() or []
         else:
-            # convert objects for pynode
-            for i in oldNames:
-                node = pm.PyNode(i)
-                self.objectsList.append(node.fullPath())
+            # long names of all objects in one query, no PyNode per object
+            self.objectsList = cmds.ls(oldNames, long=True) or []
 
         self.modelName = modelName
 
         self.strPattern = '<str>'
         self.numPattern = '<num>'
         self.lPriority = numFrequency
+        self.onConflict = onConflict
+        self.conflicts = []
 
-        self.renameObjects()
+        self.plan = self.buildPlan()
+        if not dryRun:
+            self.renameObjects()
+
+    def buildPlan(self):
+        """
+        Compute the old -> new names of all objects, without touching the scene
+        :return: RenamePlan
+        """
+        contexts = template_contexts(compile_template(self.modelName), self.objectsList)
+        newNames = plan_names(self.modelName, len(self.objectsList), self.lPriority, contexts)
+
+        # mixed patterns may produce less names than objects, these are left untouched
+        plan = build_plan(self.objectsList[:len(newNames)], newNames)
+
+        if self.onConflict == 'ignore' or not plan:
+            return plan
+
+        plan, self.conflicts = find_conflicts(plan, scene_name_index(),
+                                              resolve=self.onConflict == 'resolve')
+        if self.conflicts and self.onConflict == 'error':
+            raise RuntimeError('%d names already exist: %s' % (len(self.conflicts),
+                                                                ', '.join(new for old, new in self.conflicts[:10])))
+        return plan
 
     def renameObjects(self):
         """
         Rename selected objects
         :return: None
         """
+        apply_plan(self.plan)
+
 
-        # if only string pattern
-        if re.search(self.strPattern, self.modelName) and not re.search(self.numPattern, self.modelName):
-            # occurrences of string pattern
-            strOcc = len(re.findall(self.strPattern, self.modelName))
-            splitList = self.modelName.split(self.strPattern)
-            prefix = splitList[0]
-            suffix = splitList[-1]
-
-            # rename object List
-            if self.objectsList:
-                newNames = alphabetical_constructor(prefix          =   prefix,
-                                                    suffix          =   suffix,
-                                                    decimalPlaces   =   strOcc,
-                                                    lenSel          =   len(self.objectsList))
-                for i in range(len(self.objectsList)):
-                    name=newNames.next()
-                    pm.rename(self.objectsList[i], name)
-
-        # if only number pattern
-        elif re.search(self.numPattern, self.modelName) and not re.search(self.strPattern, self.modelName):
-            # occurrences of numeric pattern
-            numOcc = len(re.findall(self.numPattern, self.modelName))
-            splitList = self.modelName.split(self.numPattern)
-            prefix = splitList[0]
-            suffix = splitList[-1]
-
-            # rename object List
-            if self.objectsList:
-                newNames = numeric_constructor(     prefix          =   prefix,
-                                                    suffix          =   suffix,
-                                                    decimalPlaces   =   numOcc,
-                                                    lenSel          =   len(self.objectsList))
-                for i in range(len(self.objectsList)):
-                    name=newNames.next()
-                    pm.rename(self.objectsList[i], name)
-
-        # string and number pattern
-        elif re.search(self.numPattern, self.modelName) and re.search(self.strPattern, self.modelName):
-            # occurrences of string pattern
-            strOcc = len(re.findall(self.strPattern, self.modelName))
-
-            # occurrences of numeric pattern
-            numOcc = len(re.findall(self.numPattern, self.modelName))
-
-            # split the name list: prefix_<str>_middle_<num><num>_mesh
-            splitList = [spt
-                         for n in self.modelName.split(self.strPattern)
-                         for spt in n.split(self.numPattern)
-                         if not spt == ""]
-
-            # verify consistency of pattern of names
-            if len(splitList) < 3:
-                return
-            else:
-                prefix = splitList[0]
-                middle = splitList[1]
-                suffix = splitList[-1]
-
-            # instance of alphabetical_constructor
-            newAlpNm = alphabetical_constructor  (prefix         = prefix,
-                                                  suffix         = middle,
-                                                  decimalPlaces  = strOcc,
-                                                  lenSel         = int(len(self.objectsList))/self.lPriority)
-
-            # list of names with alphabetical pattern
-            baseNames = [newAlpNm.next() for n in range(int(len(self.objectsList))/self.lPriority)]
-
-            # create the final list of names
-            allNames = []
-            if baseNames:
-                for name in baseNames:
-                    newNumNm = numeric_constructor(prefix        = name,
-                                                   suffix        = suffix,
-                                                   decimalPlaces = numOcc,
-                                                   lenSel        = self.lPriority)
-                    for i in range(self.lPriority):
-                        allNames.append(newNumNm.next())
-
-            # rename with new names
-            if allNames:
-                for index in range(len(allNames)):
-                    pm.rename(self.objectsList[index], allNames[index])
+def apply_plan(plan, journal=True):
+    """
+    #
+    # # apply a RenamePlan in one pass, as a single undo step
+    #
+    # The entries are renamed in plan order, deepest-first when the plan comes
+    # from build_plan, so the stored long names never go stale.
+    # The batch is transactional: the first error reverts the renames already
+    # done and is raised again. With journal=True the plan is also written to
+    # disk first (see gvRenameJournal), so recover_journals can revert it if
+    # Maya dies in the middle. The UUIDs come from one bulk ls.
+    #
+    :param plan: RenamePlan
+    :param journal: write the rollback journal to disk
+    :return: list of the resulting names
+    """
+    result = []
+    # the batches of apply_plan_steps in one undo step
+    cmds.undoInfo(openChunk=True, chunkName='gvRenamer')
+    try:
+        run_task(apply_plan_steps(plan, journal, result))
+    finally:
+        cmds.undoInfo(closeChunk=True)
+    return result
 
 
-def get_selection():
+def apply_plan_steps(plan, journal=True, result=None, batch=RENAME_BATCH):
     """
     #
-    # # get a list of selected objects (full path name)
+    # # apply_plan as a gvTaskRunner task, batch renames per yield
     #
-    :return: list of long names - pymel instances
+    # Inside Maya the renames are queued in one MDGModifier, done batch by
+    # batch and put in the undo queue as a single step at the end (gvUndo):
+    # one Ctrl+Z undoes the whole plan, and no undo chunk stays open while the
+    # UI runs. An error or a cancel undoes the modifier. Without the API
+    # (gvFakeMaya) every batch is a cmds.rename undo chunk, and the renames
+    # already done are reverted from the record.
+    #
+    :param result: list receiving the resulting names
+    :return: generator
     """
-    objs = pm.ls(selection=True, long=True)
-    if objs:
-        return objs
+    result = [] if result is None else result
+    entries = plan.changed()
+    if not entries:
+        return
+
+    uuids = cmds.ls([old for old, new in entries], uuid=True) or []
+    if len(uuids) != len(entries):
+        raise RuntimeError('%d objects of the plan no longer exist' % (len(entries) - len(uuids)))
+
+    record = [(uuid, short_name(old), new) for uuid, (old, new) in zip(uuids, entries)]
+    if journal:
+        journal = RenameJournal.create(journal_dir(), cmds.file(query=True, sceneName=True), record)
+
+    modifier = nodes = None
+    if gvUndo.available():
+        modifier = gvUndo.modifier()
+        # the MObjects stay valid when their parents are renamed
+        nodes = gvUndo.dependency_nodes([old for old, new in entries])
+
+    rename = cmds.rename
+    try:
+        for start in range(0, len(entries), batch):
+            yield Progress(start, len(entries), 'rename')
+            stop = start + batch
+            if modifier is not None:
+                for node, (old, new) in zip(nodes[start:stop], entries[start:stop]):
+                    modifier.renameNode(node, new)
+                modifier.doIt()
+                result.extend(gvUndo.node_name(node) for node in nodes[start:stop])
+                continue
+
+            cmds.undoInfo(openChunk=True, chunkName='gvRenamer')
+            try:
+                for old, new in entries[start:stop]:
+                    result.append(rename(old, new))
+            finally:
+                cmds.undoInfo(closeChunk=True)
+
+        if modifier is not None:
+            gvUndo.commit(modifier)
+    except BaseException:
+        # errors and cancels (GeneratorExit)
+        if modifier is not None:
+            modifier.undoIt()
+            raise
+
+        cmds.undoInfo(openChunk=True, chunkName='gvRenamer')
+        try:
+            rollback(record[:len(result)])
+        finally:
+            cmds.undoInfo(closeChunk=True)
+        raise
+    finally:
+        if journal:
+            journal.close()
+
+
+def rollback(record):
+    """
+    #
+    # # revert renames, last first
+    #
+    :param record: list of (uuid, oldName, newName) of the renames done
+    :return: amount of reverted objects
+    """
+    reverted = 0
+    for uuid, old, new in reversed(record):
+        node = cmds.ls(uuid, long=True)
+        if node and short_name(node[0]) != old:
+            cmds.rename(node[0], old)
+            reverted += 1
+    return reverted
 
 
-def numeric_constructor(prefix, suffix, decimalPlaces, lenSel):
+def journal_dir():
+    """
+    # # folder of the rename journals
     """
+    return os.path.join(cmds.internalVar(userAppDir=True), 'gvRigTools', 'renameJournals')
+
+
+def recover_journals(directory=None):
+    """
+    #
+    # # revert the batch renames interrupted by a crash
     #
-    # # numeric name generator
+    # Only journals of the scene currently open are applied, in one undo chunk.
+    # A node is reverted only if it still has the name the batch gave it.
     #
-    :param prefix: preffix of new name
-    :param suffix: suffix of new name
-    :param decimalPlaces: amount of decimal places
-    :param lenSel: amount of selection list
-    :return: new name
+    :param directory: folder of the journals, journal_dir() by default
+    :return: amount of reverted objects
     """
-    lenSel += 1
-    num = 1
-    while num < lenSel:
-        # yield new name
-        yield '{}{:0{}d}{}'.format(prefix, num, decimalPlaces, suffix)
-        num +=1
+    scene = cmds.file(query=True, sceneName=True)
+    journals = [j for j in pending_journals(directory or journal_dir()) if j.scene == scene]
+
+    reverted = 0
+    for journal in reversed(journals):
+        cmds.undoInfo(openChunk=True, chunkName='gvRenamerRecover')
+        try:
+            reverted += rollback([(uuid, old, new) for uuid, old, new in journal.entries
+                                  if short_name((cmds.ls(uuid) or [''])[0]) == new])
+        finally:
+            cmds.undoInfo(closeChunk=True)
+        journal.close()
 
+    return reverted
 
-def alphabetical_constructor(prefix, suffix, decimalPlaces=2, lenSel=0):
+
+def rename_scene(search, replace, regex=False, ignoreCase=False, nodeType=None, dryRun=False):
     """
     #
-    # # alphabetical name generator
+    # # search/replace or regex rename of the whole scene
+    #
+    # One cmds.ls snapshot is filtered in a generator pipeline, only the nodes
+    # whose name changes are planned and renamed. Read-only nodes (referenced,
+    # default nodes) are skipped, the clashing names are resolved up front
+    # against the same snapshot.
     #
-    :param prefix: preffix of new name
-    :param suffix: suffix of new name
-    :param decimalPlaces: amount of decimal places
-    :param lenSel: amount of selection list
-    :return: new name
+    :param search: text to search, or regex if regex is True
+    :param replace: replacement text
+    :param regex: search is a regular expression
+    :param ignoreCase: case insensitive search
+    :param nodeType: only nodes of this type (any type of cmds.ls)
+    :param dryRun: only plan, the scene is not changed
+    :return: (RenamePlan, dict with the counters scanned, matched, conflicts and renamed)
     """
+    if nodeType:
+        snapshot = cmds.ls(long=True, type=nodeType) or []
+    else:
+        snapshot = cmds.ls(long=True) or []
+    readOnly = set(cmds.ls(long=True, readOnly=True) or [])
+
+    stats = {'scanned': 0, 'matched': 0, 'conflicts': 0, 'renamed': 0}
+    pairs = list(replace_names((name for name in snapshot if name not in readOnly),
+                               search, replace, regex=regex, ignoreCase=ignoreCase, stats=stats))
 
-    # instance of the function letters_constructor
-    alphabetSequence = letters_constructor(decimalPlaces)
+    plan = build_plan([old for old, new in pairs], [new for old, new in pairs])
+    if nodeType:
+        index = scene_name_index()
+    else:
+        index = NameIndex(snapshot)
+    plan, conflicts = find_conflicts(plan, index, resolve=True)
+    stats['conflicts'] = len(conflicts)
 
-    num = 0
-    while num < lenSel:
-        # yield new name
-        yield '{}{}{}'.format(prefix, alphabetSequence.next(), suffix)
-        num +=1
+    if not dryRun:
+        stats['renamed'] = len(apply_plan(plan))
 
+    return plan, stats
 
-def letters_constructor(decimalPlaces=2):
+
+def template_contexts(template, longNames):
     """
     #
-    # # generator letter combinations
+    # # token values of every object, only if the template uses tokens
     #
-    :param decimalPlaces: amount of decimal places
-    :return: letters combination
+    :param template: gvNameTemplate.NameTemplate
+    :param longNames: list of long names
+    :return: list of dicts, or None
     """
+    if not template.tokens:
+        return None
+
+    types = [''] * len(longNames)
+    if 'type' in template.tokens and longNames:
+        # name, type, name, type... in one query
+        types = (cmds.ls(longNames, showType=True) or [])[1::2]
+
+    return [node_context(name, nodeType) for name, nodeType in zip(longNames, types)]
 
-    # alphabet list
-    alphabet = string.ascii_uppercase
 
-    # generator of letters combination
-    letters = ("".join(comb) for comb in cwr(alphabet, decimalPlaces))
+def scene_name_index():
+    """
+    #
+    # # index of the short names of every node of the scene, one bulk ls
+    #
+    :return: NameIndex
+    """
+    return NameIndex(cmds.ls(long=True) or [])
 
-    for letter in letters:
-        # yield letter sequence
-        yield letter
+
+def get_selection():
+    """
+    #
+    # # get a list of selected objects (full path name)
+    #
+    :return: list of long names
+    """
+    objs = cmds.ls(selection=True, long=True)
+    if objs:
+        return objs
@@ -0,0 +1,158 @@
+"""
+#
+# # Snapshot of the selection shared by the tools
+#
+# SelectionSnapshot resolves the selected nodes, their shapes and node types
+# with three bulk queries (ls, listRelatives, ls showType) and indexes them in
+# dicts and sets. SelectionService keeps the last snapshot
+# and only rebuilds it after Maya reports a change (selection, names, DAG,
+# undo, new/open scene). Without the Maya API (no callbacks) every call rebuilds it.
+#
+"""
+import maya.cmds as cmds
+
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
+
+
+# events of MEventMessage after which the snapshot is rebuilt
+EVENTS = ('SelectionChanged', 'NameChanged', 'Undo', 'Redo', 'SceneOpened', 'NewSceneOpened')
+
+# service shared by the tools, see selection_service()
+_service = None
+
+
+class SelectionSnapshot(object):
+    """
+    # # selected nodes with their shapes and types
+    """
+    def __init__(self, nodes=None):
+        """
+        :param nodes: long names, the current selection if None
+        """
+        if nodes is None:
+            nodes = cmds.ls(sl=True, long=True) or []
+        self.nodes = list(nodes)
+        self.selected = set(self.nodes)
+
+        self.shapes = {}
+        self.types = {}
+        if not self.nodes:
+            return
+
+        # shapes of every selected node, the parent is in the long name of the shape
+        shapes = cmds.listRelatives(self.nodes, shapes=True, fullPath=True, noIntermediate=True) or []
+        for shape in shapes:
+            self.shapes.setdefault(shape.rsplit('|', 1)[0], []).append(shape)
+
+        everything = self.nodes + shapes
+        typed = cmds.ls(everything, showType=True, long=True) or []
+        self.types = dict(zip(typed[0::2], typed[1::2]))
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __contains__(self, node):
+        return node in self.selected
+
+    def shapesOf(self, node):
+        """
+        :return: list of the shapes of node
+        """
+        return self.shapes.get(node, [])
+
+    def allShapes(self):
+        """
+        :return: the shapes of every selected node, in selection order
+        """
+        return [shape for node in self.nodes for shape in self.shapes.get(node, ())]
+
+    def typeOf(self, node):
+        return self.types.get(node)
+
+    def transforms(self):
+        """
+        :return: the selected transforms (and joints), in selection order
+        """
+        return [node for node in self.nodes if node in self.shapes or self.types.get(node) in ('transform', 'joint')]
+
+    def withShapeType(self, shapeTypes):
+        """
+        #
+        # # selected nodes with a shape of one of the types
+        #
+        :param shapeTypes: iterable of node types
+        :return: list of (node, type of its first matching shape), in selection order
+        """
+        shapeTypes = set(shapeTypes)
+        found = []
+        for node in self.nodes:
+            for shape in self.shapes.get(node, ()):
+                shapeType = self.types.get(shape)
+                if shapeType in shapeTypes:
+                    found.append((node, shapeType))
+                    break
+        return found
+
+
+class SelectionService(object):
+    """
+    # # cached SelectionSnapshot, rebuilt when Maya reports a change
+    """
+    def __init__(self):
+        self.current = None
+        self.callbacks = []
+        self.rebuilds = 0
+
+        if om is not None and hasattr(om, 'MEventMessage'):
+            for event in EVENTS:
+                self.callbacks.append(om.MEventMessage.addEventCallback(event, self.invalidate))
+            # reparenting changes the long names without any of the events
+            self.callbacks.append(om.MDagMessage.addAllDagChangesCallback(self.invalidate))
+
+    @property
+    def watching(self):
+        return bool(self.callbacks)
+
+    def snapshot(self):
+        """
+        :return: SelectionSnapshot of the current selection
+        """
+        if self.current is None or not self.watching:
+            self.current = SelectionSnapshot()
+            self.rebuilds += 1
+        return self.current
+
+    def invalidate(self, *args):
+        """
+        # # drop the snapshot, called by the callbacks and after edits of the tools (renames...)
+        """
+        self.current = None
+
+    def close(self):
+        if self.callbacks and om is not None:
+            om.MMessage.removeCallbacks(self.callbacks)
+        self.callbacks = []
+        self.current = None
+
+
+def selection_service():
+    """
+    # # the SelectionService of the session, created on first use
+    """
+    global _service
+    if _service is None:
+        _service = SelectionService()
+    return _service
+
+
+def selection():
+    """
+    :return: SelectionSnapshot of the current selection, cached
+    """
+    return selection_service().snapshot()
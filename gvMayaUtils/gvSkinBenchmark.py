@@ -0,0 +1,326 @@
+"""
+#
+# # Copy skin benchmarks over synthetic meshes and the in-memory scene of gvFakeMaya
+#
+# Builds a skinned source mesh (grid, sphere or cylinder) with random sparse
+# weights and a target, then times gvCopySkin.copySkinTargets: shapesQuery,
+# skinClusterList, source gathering (cold and cached), the transfer and the
+# write. 'cold' and 'warm' start without transferred targets, 'incremental'
+# runs again over the targets of the warm run (only the moved points). The skinCluster API of gvSkinCluster is replaced by FakeSkinIO, which
+# keeps the arrays on the fake nodes. Each run records the vertices per
+# second, the peak memory and the backend calls.
+#
+# Modes: 'transfer' (target with another topology, closest point transfer)
+#        'topology' (target with the source topology, direct copy)
+#
+#     mayapy gvSkinBenchmark.py --sizes 1000 10000 100000 1000000 --json skin.json
+#
+"""
+from __future__ import print_function
+
+import argparse
+import hashlib
+import json
+import sys
+from timeit import default_timer as timer
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+import gvFakeMaya
+gvFakeMaya.install()
+
+import gvCopySkin
+import gvSkinCache
+from gvSkinCache import SkinCache
+from gvSkinWeights import SkinWeights, SparseWeights, np, require_numpy
+
+
+SIZES = (1000, 10000, 100000)
+SHAPES = ('grid', 'sphere', 'cylinder')
+MODES = ('transfer', 'topology')
+
+# joints of the source skinCluster and influences per vertex
+INFLUENCES = 64
+WEIGHTS_PER_VERTEX = 4
+
+
+class FakeSkinIO(object):
+    """
+    #
+    # # stand-in of gvSkinCluster over a FakeCmds scene
+    #
+    # Shapes keep 'points' and 'triangles' arrays in their attrs, skinClusters
+    # keep 'weights' (SkinWeights). self.calls counts every function by name.
+    #
+    """
+    def __init__(self, cmds):
+        self.cmds = cmds
+        self.calls = {}
+
+    def _count(self, function):
+        self.calls[function] = self.calls.get(function, 0) + 1
+
+    def _shape(self, skinCluster):
+        node = self.cmds.scene.find(skinCluster)
+        return [n for n in node.attrs['connections'] if n.type in gvFakeMaya.SHAPE_TYPES][0]
+
+    def skinned_shape_name(self, skinCluster):
+        self._count('skinned_shape_name')
+        return self._shape(skinCluster).longName()
+
+    def influences(self, skinCluster):
+        self._count('influences')
+        return list(self.cmds.scene.find(skinCluster).attrs['influences'])
+
+    def influence_uuids(self, names):
+        self._count('influence_uuids')
+        return [self.cmds.scene.find(name).uuid for name in names]
+
+    def read_skin_weights(self, skinCluster, shape=None):
+        self._count('read_skin_weights')
+        return self.cmds.scene.find(skinCluster).attrs['weights'].copy()
+
+    def write_skin_weights(self, skinCluster, weights, shape=None, normalize=False):
+        self._count('write_skin_weights')
+        node = self.cmds.scene.find(skinCluster)
+        missing = [name for name in weights.influences if name not in node.attrs['influences']]
+        if missing:
+            raise RuntimeError('%s are not influences of %s' % (', '.join(missing), skinCluster))
+        if len(self._shape(skinCluster).attrs['points']) != weights.vertexCount:
+            raise RuntimeError('%d weights for the points of %s' % (weights.vertexCount, skinCluster))
+        node.attrs['weights'] = weights
+
+    def point_count(self, shape):
+        self._count('point_count')
+        return len(self.cmds.scene.find(shape).attrs['points'])
+
+    def points(self, shape, worldSpace=True):
+        self._count('points')
+        return self.cmds.scene.find(shape).attrs['points'].copy()
+
+    def triangles(self, shape):
+        self._count('triangles')
+        return self.cmds.scene.find(shape).attrs['triangles']
+
+    def topology_hash(self, shape):
+        self._count('topology_hash')
+        node = self.cmds.scene.find(shape)
+        digest = hashlib.sha1(np.array([len(node.attrs['points'])], dtype='<i8').tobytes())
+        digest.update(np.ascontiguousarray(node.attrs['triangles'], dtype='<i4').tobytes())
+        return digest.hexdigest()
+
+
+def grid_topology(rows, cols):
+    """
+    :return: (f x 3) triangles of a rows x cols vertex grid, two per quad
+    """
+    index = np.arange(rows * cols).reshape(rows, cols)
+    a = index[:-1, :-1].ravel()
+    b = index[:-1, 1:].ravel()
+    c = index[1:, :-1].ravel()
+    d = index[1:, 1:].ravel()
+    return np.concatenate([np.stack((a, b, d), axis=1), np.stack((a, d, c), axis=1)])
+
+
+def synthetic_mesh(shape, size, offset=0.0):
+    """
+    #
+    # # points and triangles of a mesh of about size vertices
+    #
+    :param shape: 'grid', 'sphere' or 'cylinder'
+    :param size: amount of vertices wanted
+    :param offset: shift of the parameters, gives a different sampling of the same surface
+    :return: ((n x 3) points, (f x 3) triangles)
+    """
+    require_numpy()
+    rows = max(int(round(np.sqrt(size))), 2)
+    cols = max(size // rows, 2)
+    u, v = np.meshgrid(np.linspace(0.0, 1.0, cols) + offset / cols,
+                       np.linspace(0.0, 1.0, rows) + offset / rows)
+    u, v = u.ravel(), v.ravel()
+
+    if shape == 'grid':
+        points = np.stack((u * 10.0, np.zeros_like(u), v * 10.0), axis=1)
+    elif shape == 'sphere':
+        theta, phi = u * 2.0 * np.pi, v * np.pi
+        points = np.stack((np.sin(phi) * np.cos(theta), np.cos(phi), np.sin(phi) * np.sin(theta)), axis=1) * 5.0
+    elif shape == 'cylinder':
+        theta = u * 2.0 * np.pi
+        points = np.stack((np.cos(theta) * 2.0, v * 10.0, np.sin(theta) * 2.0), axis=1)
+    else:
+        raise ValueError('unknown shape %s' % shape)
+
+    return points, grid_topology(rows, cols)
+
+
+def random_weights(influences, vertexCount, perVertex=WEIGHTS_PER_VERTEX, seed=0):
+    """
+    #
+    # # sparse weights: perVertex consecutive influences per vertex, normalized
+    #
+    :return: SkinWeights in CSR layout
+    """
+    rng = np.random.RandomState(seed)
+    count = len(influences)
+    perVertex = min(perVertex, count)
+
+    indices = (rng.randint(0, count, vertexCount)[:, None] + np.arange(perVertex)[None, :]) % count
+    data = rng.random_sample((vertexCount, perVertex))
+    data /= data.sum(axis=1)[:, None]
+
+    indptr = np.arange(0, vertexCount * perVertex + 1, perVertex, dtype=np.int64)
+    weights = SparseWeights(indptr, indices.ravel().astype(np.int32), data.ravel(), (vertexCount, count))
+    return SkinWeights(influences, weights)
+
+
+def add_mesh(cmds, name, points, triangles):
+    """
+    :return: long name of the new transform
+    """
+    transform = cmds.scene.createNode('transform', name)
+    shape = cmds.scene.createNode('mesh', name + 'Shape', parent=transform)
+    shape.attrs['points'] = points
+    shape.attrs['triangles'] = triangles
+    return transform.longName()
+
+
+def build_scene(shape, size, mode, influenceCount=INFLUENCES):
+    """
+    #
+    # # fake scene with a skinned source and an unskinned target
+    #
+    :return: (FakeCmds, source, target)
+    """
+    cmds = gvFakeMaya.FakeCmds()
+    root = cmds.scene.createNode('joint', 'root')
+    joints = [cmds.scene.createNode('joint', 'jnt%d' % i, parent=root).longName() for i in range(influenceCount)]
+
+    points, triangles = synthetic_mesh(shape, size)
+    source = add_mesh(cmds, 'source', points, triangles)
+    skinCl = cmds.skinCluster(joints, source, tsb=1, ibp=1)[0]
+    cmds.scene.find(skinCl).attrs['weights'] = random_weights(joints, len(points))
+
+    if mode == 'topology':
+        target = add_mesh(cmds, 'target', points + 0.01, triangles)
+    else:
+        target = add_mesh(cmds, 'target', *synthetic_mesh(shape, int(size * 1.1), offset=0.5))
+
+    cmds.resetCalls()
+    return cmds, source, target
+
+
+def bench_copy_skin(shape, size, mode, processes=None):
+    """
+    #
+    # # time a cold copy skin (empty cache), a warm one (cached source) and an incremental one
+    #
+    # cold and warm empty the transfer cache first, so the warm run only
+    # measures the cached source.
+    #
+    :return: list of three result dicts
+    """
+    cmds, source, target = build_scene(shape, size, mode)
+    io = FakeSkinIO(cmds)
+    gvCopySkin.cmds = cmds
+    gvCopySkin.gvSkinCluster = io
+    # the api modules of gvFakeMaya are empty: no invalidation callbacks
+    gvSkinCache.om = None
+
+    cache = SkinCache()
+    gvCopySkin.topologyCache = SkinCache(topologyOnly=True)
+    targetCount = len(cmds.scene.find(target + '|targetShape').attrs['points'])
+
+    results = []
+    for state in ('cold', 'warm', 'incremental'):
+        if state != 'incremental':
+            gvCopySkin.transferCache = SkinCache(topologyOnly=True)
+        cmds.resetCalls()
+        cmds.undoChunks = 0
+        io.calls = {}
+
+        if tracemalloc is not None:
+            tracemalloc.start()
+        start = timer()
+        gvCopySkin.copySkinTargets([source], [target], processes=processes, cache=cache)
+        seconds = timer() - start
+        peak = peak_memory()
+
+        calls = dict(cmds.calls)
+        calls.update(('api.' + name, count) for name, count in io.calls.items())
+        results.append({'bench'            : 'copySkin',
+                        'shape'            : shape,
+                        'mode'             : mode,
+                        'cache'            : state,
+                        'size'             : size,
+                        'targetVertices'   : targetCount,
+                        'seconds'          : seconds,
+                        'verticesPerSecond': targetCount / seconds if seconds else 0.0,
+                        'peakMemory'       : peak,
+                        'calls'            : calls,
+                        'totalCalls'       : sum(calls.values()),
+                        'undoChunks'       : cmds.undoChunks,
+                        'cacheStats'       : cache.stats(),
+                        'transferStats'    : gvCopySkin.transferCache.stats()})
+    return results
+
+
+def peak_memory():
+    """
+    # # peak traced memory of the run in bytes (python 3), else the peak rss of the process
+    """
+    if tracemalloc is not None:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    # kilobytes on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def run(sizes=SIZES, shapes=SHAPES, modes=MODES, processes=None):
+    """
+    :return: list of result dicts
+    """
+    results = []
+    for size in sizes:
+        for shape in shapes:
+            for mode in modes:
+                results.extend(bench_copy_skin(shape, size, mode, processes))
+    return results
+
+
+def report(results, stream=sys.stdout):
+    line = '{:<10}{:<10}{:<12}{:>9}{:>10}{:>12}{:>10}{:>14}'
+    print(line.format('shape', 'mode', 'cache', 'size', 'seconds', 'verts/s', 'peakMB', 'backendCalls'), file=stream)
+    for r in results:
+        peak = '%.1f' % (r['peakMemory'] / 1048576.0) if r['peakMemory'] is not None else '-'
+        print(line.format(r['shape'], r['mode'], r['cache'], r['size'], '%.3f' % r['seconds'],
+                          '%d' % r['verticesPerSecond'], peak, r['totalCalls']), file=stream)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='gvCopySkin benchmarks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES))
+    parser.add_argument('--shapes', nargs='+', choices=SHAPES, default=list(SHAPES))
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--processes', type=int, help='workers of the transfer, cpu count by default')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.shapes, args.modes, args.processes)
+    report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+"""
+#
+# # Cache of the source skin data of copy skin, keyed by node UUID
+#
+# An entry holds the points, triangles and weights of one source transform
+# (gvSkinTransfer.SourceSkin). It is dropped when Maya reports a change on
+# its shapes or skinClusters (dirty / about to delete callbacks), and the
+# whole cache is cleared when a scene is opened or created. The memory is
+# bounded by an LRU on the size of the arrays.
+#
+"""
+from collections import OrderedDict
+
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
+
+
+# default memory bound of a cache, in bytes
+MAX_BYTES = 512 * 1024 * 1024
+
+
+class SkinCache(object):
+    """
+    # # LRU cache of SourceSkin entries (or any per node value) with hit/miss counters
+    """
+    def __init__(self, maxBytes=MAX_BYTES, topologyOnly=False):
+        """
+        :param maxBytes: memory bound of the arrays of all entries
+        :param topologyOnly: invalidate on mesh topology changes only, not on any dirty
+                             attribute (for values that depend on the connectivity only)
+        """
+        self.maxBytes = maxBytes
+        self.topologyOnly = topologyOnly
+        self.entries = OrderedDict()
+        self.dirty = set()
+        self.callbacks = {}
+        self.sceneCallbacks = []
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, uuid):
+        return uuid in self.entries and uuid not in self.dirty
+
+    def get(self, uuid, loader):
+        """
+        #
+        # # cached value of uuid, loaded and watched on a miss
+        #
+        :param uuid: UUID of the source node
+        :param loader: function returning (value, nodes), value being a SourceSkin and
+                       nodes the names whose changes invalidate it (shapes, skinClusters)
+        :return: value
+        """
+        if uuid in self.dirty:
+            self.discard(uuid)
+
+        entry = self.entries.get(uuid)
+        if entry is not None:
+            self.hits += 1
+            self.entries.pop(uuid)
+            self.entries[uuid] = entry
+            return entry[0]
+
+        self.misses += 1
+        value, nodes = loader()
+        size = nbytes(value)
+
+        self.entries[uuid] = (value, size)
+        self.bytes += size
+        self.watch(uuid, nodes)
+        self.evict()
+        return value
+
+    def peek(self, uuid):
+        """
+        # # cached value of uuid, None on a miss (nothing is loaded)
+        """
+        if uuid in self.dirty:
+            self.discard(uuid)
+
+        entry = self.entries.get(uuid)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.pop(uuid)
+        self.entries[uuid] = entry
+        return entry[0]
+
+    def put(self, uuid, value, nodes=()):
+        """
+        # # store a value computed elsewhere, watched like a loaded one
+        """
+        self.discard(uuid)
+        size = nbytes(value)
+        self.entries[uuid] = (value, size)
+        self.bytes += size
+        self.watch(uuid, nodes)
+        self.evict()
+
+    def invalidate(self, uuid):
+        """
+        # # mark an entry as stale, it is dropped on the next access
+        # # (safe to call from a Maya callback)
+        """
+        if uuid in self.entries and uuid not in self.dirty:
+            self.dirty.add(uuid)
+            self.invalidations += 1
+
+    def discard(self, uuid):
+        entry = self.entries.pop(uuid, None)
+        if entry is not None:
+            self.bytes -= entry[1]
+        self.dirty.discard(uuid)
+        self.unwatch(uuid)
+
+    def clear(self, *args):
+        for uuid in list(self.entries):
+            self.discard(uuid)
+
+    def evict(self):
+        """
+        # # drop the least recently used entries above the memory bound
+        """
+        while self.bytes > self.maxBytes and len(self.entries) > 1:
+            uuid = next(iter(self.entries))
+            self.discard(uuid)
+            self.evictions += 1
+
+    def stats(self):
+        """
+        :return: dict with the counters and the memory in use
+        """
+        lookups = self.hits + self.misses
+        return {'entries'       : len(self.entries),
+                'bytes'         : self.bytes,
+                'hits'          : self.hits,
+                'misses'        : self.misses,
+                'hitRate'       : float(self.hits) / lookups if lookups else 0.0,
+                'evictions'     : self.evictions,
+                'invalidations' : self.invalidations}
+
+    def watch(self, uuid, nodes):
+        """
+        # # register the Maya callbacks that invalidate uuid
+        """
+        if om is None or not nodes:
+            return
+
+        if not self.sceneCallbacks:
+            for message in (om.MSceneMessage.kBeforeNew, om.MSceneMessage.kBeforeOpen):
+                self.sceneCallbacks.append(om.MSceneMessage.addCallback(message, self.clear))
+
+        selection = om.MSelectionList()
+        for node in nodes:
+            selection.add(node)
+
+        invalidate = lambda *args: self.invalidate(uuid)
+        ids = []
+        for i in range(selection.length()):
+            obj = selection.getDependNode(i)
+            if not self.topologyOnly:
+                ids.append(om.MNodeMessage.addNodeDirtyCallback(obj, invalidate))
+            elif obj.hasFn(om.MFn.kMesh):
+                ids.append(om.MPolyMessage.addPolyTopologyChangedCallback(obj, invalidate))
+            ids.append(om.MNodeMessage.addNodeAboutToDeleteCallback(obj, invalidate))
+        self.callbacks[uuid] = ids
+
+    def unwatch(self, uuid):
+        ids = self.callbacks.pop(uuid, None)
+        if ids and om is not None:
+            om.MMessage.removeCallbacks(ids)
+
+
+def nbytes(value):
+    """
+    # # memory of the numpy arrays of a SourceSkin
+    """
+    size = 0
+    for array in (getattr(value, 'points', None), getattr(value, 'triangles', None)):
+        if array is not None:
+            size += array.nbytes
+
+    weights = getattr(getattr(value, 'weights', None), 'weights', None)
+    if weights is not None:
+        for array in (getattr(weights, 'indptr', None), getattr(weights, 'indices', None),
+                      getattr(weights, 'data', None)):
+            if array is not None:
+                size += array.nbytes
+        if hasattr(weights, 'nbytes'):
+            size += weights.nbytes
+
+    return size
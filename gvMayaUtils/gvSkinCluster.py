@@ -0,0 +1,215 @@
+"""
+#
+# # Bulk skinCluster I/O through the Maya API 2.0
+#
+# The weights of a whole skinCluster are read and written with one
+# MFnSkinCluster.getWeights / setWeights call over all the components of the
+# shape, and handed around as gvSkinWeights.SkinWeights arrays.
+#
+"""
+import hashlib
+
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+from gvSkinWeights import SkinWeights, np, require_numpy
+
+
+def dag_path(name):
+    """
+    :param name: name of a DAG node
+    :return: MDagPath
+    """
+    selection = om.MSelectionList()
+    selection.add(name)
+    return selection.getDagPath(0)
+
+
+def skin_fn(skinCluster):
+    """
+    :param skinCluster: name of a skinCluster node
+    :return: MFnSkinCluster
+    """
+    selection = om.MSelectionList()
+    selection.add(skinCluster)
+    return oma.MFnSkinCluster(selection.getDependNode(0))
+
+
+def all_components(path):
+    """
+    #
+    # # component object with every vertex/cv of the shape
+    #
+    :param path: MDagPath of a mesh, nurbsSurface or nurbsCurve
+    :return: MObject
+    """
+    if path.hasFn(om.MFn.kMesh):
+        fn = om.MFnSingleIndexedComponent()
+        components = fn.create(om.MFn.kMeshVertComponent)
+        fn.setCompleteData(om.MFnMesh(path).numVertices)
+    elif path.hasFn(om.MFn.kNurbsSurface):
+        surface = om.MFnNurbsSurface(path)
+        fn = om.MFnDoubleIndexedComponent()
+        components = fn.create(om.MFn.kSurfaceCVComponent)
+        fn.setCompleteData(surface.numCVsInU, surface.numCVsInV)
+    elif path.hasFn(om.MFn.kNurbsCurve):
+        fn = om.MFnSingleIndexedComponent()
+        components = fn.create(om.MFn.kCurveCVComponent)
+        fn.setCompleteData(om.MFnNurbsCurve(path).numCVs)
+    else:
+        raise TypeError('%s is not a mesh, nurbsSurface or nurbsCurve' % path.fullPathName())
+
+    return components
+
+
+def skinned_shape(fn):
+    """
+    # # MDagPath of the first shape deformed by the skinCluster
+    """
+    return om.MDagPath.getAPathTo(fn.getOutputGeometry()[0])
+
+
+def influences(skinCluster):
+    """
+    :return: list of the influence long names, in skinCluster index order
+    """
+    return [path.fullPathName() for path in skin_fn(skinCluster).influenceObjects()]
+
+
+def influence_uuids(names):
+    """
+    :param names: list of influence names
+    :return: list of their UUIDs, one ls call
+    """
+    uuids = cmds.ls(names, uuid=True) or []
+    if len(uuids) != len(names):
+        raise RuntimeError('some influences of %s do not exist' % ', '.join(names))
+    return uuids
+
+
+def read_skin_weights(skinCluster, shape=None):
+    """
+    #
+    # # every weight of the skinCluster in one getWeights call
+    #
+    :param skinCluster: name of the skinCluster
+    :param shape: deformed shape, the first output geometry by default
+    :return: gvSkinWeights.SkinWeights
+    """
+    require_numpy()
+
+    fn = skin_fn(skinCluster)
+    path = dag_path(shape) if shape else skinned_shape(fn)
+    names = [p.fullPathName() for p in fn.influenceObjects()]
+
+    weights, influenceCount = fn.getWeights(path, all_components(path))
+    return SkinWeights.fromFlat(names, np.array(weights, dtype=np.float64))
+
+
+def write_skin_weights(skinCluster, weights, shape=None, normalize=False):
+    """
+    #
+    # # write a whole weight matrix with one setWeights call
+    #
+    # The columns of weights are matched to the influences of the skinCluster by
+    # name. API edits are not in the undo queue: write to a skinCluster created
+    # in the same undo chunk, so undoing the chunk removes the weights too.
+    #
+    :param skinCluster: name of the skinCluster
+    :param weights: gvSkinWeights.SkinWeights
+    :param shape: deformed shape, the first output geometry by default
+    :param normalize: let the skinCluster normalize the weights
+    :return: None
+    """
+    fn = skin_fn(skinCluster)
+    path = dag_path(shape) if shape else skinned_shape(fn)
+
+    index = dict((p.fullPathName(), i) for i, p in enumerate(fn.influenceObjects()))
+    missing = [name for name in weights.influences if name not in index]
+    if missing:
+        raise RuntimeError('%s are not influences of %s' % (', '.join(missing), skinCluster))
+
+    components = all_components(path)
+    count = om.MFnComponent(components).elementCount
+    if count != weights.vertexCount:
+        raise RuntimeError('%d weights for the %d points of %s' % (weights.vertexCount, count, path.fullPathName()))
+
+    fn.setWeights(path,
+                  components,
+                  om.MIntArray([index[name] for name in weights.influences]),
+                  om.MDoubleArray(weights.flat().tolist()),
+                  normalize,
+                  False)
+
+
+def point_count(shape):
+    """
+    :return: amount of vertices/cvs of the shape
+    """
+    return om.MFnComponent(all_components(dag_path(shape))).elementCount
+
+
+def points(shape, worldSpace=True):
+    """
+    #
+    # # positions of every vertex/cv of the shape as a (n x 3) array, one query
+    #
+    :param shape: name of a mesh, nurbsSurface or nurbsCurve
+    :return: ndarray
+    """
+    require_numpy()
+
+    component = '.vtx[*]' if cmds.objectType(shape, isAType='mesh') else '.cv[*]'
+    flat = cmds.xform(shape + component, query=True, translation=True, worldSpace=worldSpace)
+    return np.array(flat or [], dtype=np.float64).reshape(-1, 3)
+
+
+def triangles(shape):
+    """
+    #
+    # # triangulation of a mesh as a (f x 3) array of vertex indices, one call
+    #
+    :param shape: name of the shape
+    :return: ndarray, None if the shape is not a mesh
+    """
+    require_numpy()
+
+    path = dag_path(shape)
+    if not path.hasFn(om.MFn.kMesh):
+        return None
+
+    counts, vertices = om.MFnMesh(path).getTriangles()
+    return np.array(vertices, dtype=np.int64).reshape(-1, 3)
+
+
+def topology_hash(shape):
+    """
+    #
+    # # digest of the face/vertex connectivity of a mesh, one getVertices call
+    #
+    # Two meshes with the same digest have the same vertex count and order, so
+    # their per vertex arrays can be copied index to index.
+    #
+    :param shape: name of the shape
+    :return: hex string, None if the shape is not a mesh
+    """
+    require_numpy()
+
+    path = dag_path(shape)
+    if not path.hasFn(om.MFn.kMesh):
+        return None
+
+    mesh = om.MFnMesh(path)
+    counts, vertices = mesh.getVertices()
+    digest = hashlib.sha1(np.array([mesh.numVertices], dtype='<i8').tobytes())
+    digest.update(np.array(counts, dtype='<i4').tobytes())
+    digest.update(np.array(vertices, dtype='<i4').tobytes())
+    return digest.hexdigest()
+
+
+def skinned_shape_name(skinCluster):
+    """
+    # # long name of the first shape deformed by the skinCluster
+    """
+    return skinned_shape(skin_fn(skinCluster)).fullPathName()
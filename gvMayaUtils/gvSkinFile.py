@@ -0,0 +1,148 @@
+"""
+#
+# # Binary skin weights file, loaded through numpy.memmap
+#
+# Layout (little endian):
+#
+#   magic 'GVSKIN\0\0' | uint32 version | uint32 header size | JSON header
+#   padding to ALIGNMENT | arrays
+#
+# The JSON header holds the vertex count, the influence names, the layout
+# ('dense' or 'csr') and the byte offset of every array, from the end of the
+# header padding:
+#
+#   dense: weights  float32 (vertex x influence)
+#   csr:   indptr   int64   (vertex + 1)
+#          indices  int32   (nnz)
+#          data     float32 (nnz)
+#
+# Loading maps the arrays instead of reading them: opening a big file costs
+# the header only, and the pages of the vertices actually used are read by
+# the system when they are touched.
+#
+"""
+import json
+import os
+import struct
+
+from gvSkinWeights import SkinWeights, SparseWeights, np, require_numpy
+
+
+MAGIC = b'GVSKIN\0\0'
+VERSION = 1
+EXTENSION = '.gvSkin'
+# every array starts at a multiple of ALIGNMENT bytes
+ALIGNMENT = 64
+
+_PREFIX = struct.Struct('<8sII')
+
+
+def save_weights(path, weights, sparse=None):
+    """
+    #
+    # # write SkinWeights to a weights file
+    #
+    # The file is written next to path and renamed over it when complete.
+    #
+    :param path: file path
+    :param weights: gvSkinWeights.SkinWeights
+    :param sparse: CSR layout, by default the layout of weights
+    :return: path
+    """
+    require_numpy()
+    if sparse is None:
+        sparse = weights.isSparse
+
+    if sparse:
+        w = weights.weights if weights.isSparse else SparseWeights.fromDense(weights.dense())
+        arrays = [('indptr', np.asarray(w.indptr, dtype='<i8')),
+                  ('indices', np.asarray(w.indices, dtype='<i4')),
+                  ('data', np.asarray(w.data, dtype='<f4'))]
+    else:
+        arrays = [('weights', np.ascontiguousarray(weights.dense(), dtype='<f4'))]
+
+    # offsets are relative to the data section, which starts after the header
+    offsets = {}
+    offset = 0
+    for name, array in arrays:
+        offsets[name] = offset
+        offset = _align(offset + array.nbytes)
+
+    header = {'vertexCount': weights.vertexCount,
+              'influences': weights.influences,
+              'layout': 'csr' if sparse else 'dense',
+              'arrays': dict((name, {'offset': offsets[name],
+                                     'dtype': array.dtype.str,
+                                     'shape': list(array.shape)}) for name, array in arrays)}
+    data = json.dumps(header, sort_keys=True).encode('utf-8')
+    start = _align(_PREFIX.size + len(data))
+
+    temp = path + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(data)))
+        f.write(data)
+        for name, array in arrays:
+            f.write(b'\0' * (start + offsets[name] - f.tell()))
+            array.tofile(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(temp, path)
+    return path
+
+
+def read_header(path):
+    """
+    :return: header dict of a weights file
+    """
+    with open(path, 'rb') as f:
+        prefix = f.read(_PREFIX.size)
+        if len(prefix) != _PREFIX.size:
+            raise ValueError('%s is not a skin weights file' % path)
+        magic, version, size = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError('%s is not a skin weights file' % path)
+        if version > VERSION:
+            raise ValueError('%s has version %d, this tool reads up to %d' % (path, version, VERSION))
+        header = json.loads(f.read(size).decode('utf-8'))
+
+    header['dataOffset'] = _align(_PREFIX.size + size)
+    return header
+
+
+def load_weights(path, mmap=True):
+    """
+    #
+    # # SkinWeights of a weights file
+    #
+    :param path: file path
+    :param mmap: map the arrays (read only) instead of reading them in memory
+    :return: gvSkinWeights.SkinWeights, float32 weights
+    """
+    require_numpy()
+    header = read_header(path)
+    arrays = {}
+    for name, info in header['arrays'].items():
+        shape = tuple(info['shape'])
+        offset = header['dataOffset'] + info['offset']
+        if mmap and int(np.prod(shape)):
+            arrays[name] = np.memmap(path, dtype=info['dtype'], mode='r', offset=offset, shape=shape)
+        else:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                arrays[name] = np.fromfile(f, dtype=info['dtype'], count=int(np.prod(shape))).reshape(shape)
+
+    influences = header['influences']
+    if header['layout'] == 'csr':
+        weights = SparseWeights(arrays['indptr'], arrays['indices'], arrays['data'],
+                                (header['vertexCount'], len(influences)))
+    else:
+        weights = arrays['weights']
+
+    return SkinWeights(influences, weights)
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
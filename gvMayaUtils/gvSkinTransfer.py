@@ -0,0 +1,418 @@
+"""
+#
+# # Closest point skin weight transfer over NumPy arrays
+#
+# The points of all the source shapes are combined and indexed once
+# (scipy cKDTree when available, chunked brute force in pure NumPy
+# otherwise). Every target is then transferred with vectorized operations:
+# nearest source vertex, closest of its triangles and barycentric
+# interpolation of the weights of the triangle corners.
+#
+"""
+import multiprocessing
+import os
+import sys
+import threading
+from multiprocessing.pool import ThreadPool
+
+from gvSkinWeights import SkinWeights, np, require_numpy, union_influences
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:
+    cKDTree = None
+
+
+# target points processed at once, bounds the temporary arrays
+CHUNK = 65536
+# distance a target point may move before its weights are transferred again
+TOLERANCE = 1e-4
+# distances computed at once by the brute force search
+BRUTE_FORCE_BLOCK = 2 ** 24
+
+# transfer of the current worker process, see transfer_many
+_workerTransfer = None
+
+
+class SpatialIndex(object):
+    """
+    # # nearest neighbour search over a fixed set of points
+    """
+    def __init__(self, points, useScipy=True):
+        """
+        :param points: (n x 3) array
+        :param useScipy: use cKDTree if scipy is installed
+        """
+        require_numpy()
+        self.points = np.ascontiguousarray(points, dtype=np.float64)
+        self.tree = cKDTree(self.points) if (useScipy and cKDTree is not None and len(self.points)) else None
+
+    def query(self, targets):
+        """
+        #
+        # # nearest point of every target
+        #
+        :param targets: (m x 3) array
+        :return: (distances, indices) arrays of m items
+        """
+        targets = np.asarray(targets, dtype=np.float64)
+        if self.tree is not None:
+            return self.tree.query(targets)
+
+        # |t - p|^2 = |t|^2 + |p|^2 - 2 t.p, in blocks of targets
+        points = self.points
+        pointsSq = np.einsum('ij,ij->i', points, points)
+        block = max(1, BRUTE_FORCE_BLOCK // max(len(points), 1))
+
+        indices = np.empty(len(targets), dtype=np.int64)
+        distances = np.empty(len(targets), dtype=np.float64)
+        for start in range(0, len(targets), block):
+            chunk = targets[start:start + block]
+            dist = pointsSq[None, :] - 2.0 * chunk.dot(points.T)
+            nearest = np.argmin(dist, axis=1)
+            indices[start:start + block] = nearest
+            distances[start:start + block] = dist[np.arange(len(chunk)), nearest] + np.einsum('ij,ij->i', chunk, chunk)
+
+        return np.sqrt(np.maximum(distances, 0.0)), indices
+
+
+class SourceSkin(object):
+    """
+    # # points, triangles and weights of the combined source shapes
+    """
+    def __init__(self, points, weights, triangles=None, keys=None, topologyHash=None):
+        """
+        :param points: (n x 3) array
+        :param weights: SkinWeights of the n points
+        :param triangles: (f x 3) int array of point indices, None for curves
+        :param keys: identity of each influence (UUIDs), the names by default
+        :param topologyHash: connectivity digest of a single source mesh, see gvSkinCluster.topology_hash
+        """
+        require_numpy()
+        self.points = np.asarray(points, dtype=np.float64)
+        self.weights = weights
+        self.triangles = None if triangles is None or not len(triangles) else np.asarray(triangles, dtype=np.int64)
+        self.keys = list(keys) if keys is not None else list(weights.influences)
+        self.topologyHash = topologyHash
+
+    @property
+    def influences(self):
+        return self.weights.influences
+
+    @classmethod
+    def combine(cls, sources):
+        """
+        #
+        # # merge several sources into one, influences merged by key (UUID)
+        #
+        # The result of several sources has no topology hash.
+        #
+        :param sources: list of SourceSkin
+        :return: SourceSkin
+        """
+        if len(sources) == 1:
+            return sources[0]
+
+        keys, luts = union_influences([source.keys for source in sources])
+        names = [None] * len(keys)
+        for source, lut in zip(sources, luts):
+            for name, column in zip(source.influences, lut):
+                names[column] = names[column] or name
+
+        weights = np.zeros((sum(len(s.points) for s in sources), len(keys)), dtype=np.float64)
+        triangles = []
+        offset = 0
+        for source, lut in zip(sources, luts):
+            count = len(source.points)
+            weights[offset:offset + count, lut] = source.weights.dense()
+            if source.triangles is not None:
+                triangles.append(source.triangles + offset)
+            offset += count
+
+        points = np.concatenate([s.points for s in sources])
+        triangles = np.concatenate(triangles) if triangles else None
+        return cls(points, SkinWeights(names, weights), triangles, keys)
+
+
+class TransferState(object):
+    """
+    #
+    # # result of a transfer, kept for the next incremental one
+    #
+    # points are the target positions the weights were computed for: a point
+    # that drifts below the tolerance at every run is still caught once the
+    # total drift exceeds it.
+    #
+    """
+    def __init__(self, source, points, weights):
+        """
+        :param source: SourceSkin the weights come from
+        :param points: (m x 3) array
+        :param weights: dense SkinWeights of the m points
+        """
+        self.source = source
+        self.points = points
+        self.weights = weights
+
+    def matches(self, source, targetPoints):
+        """
+        # # True if the state can be updated for this source and target
+        """
+        return self.source is source and len(self.points) == len(targetPoints)
+
+
+class ClosestPointTransfer(object):
+    """
+    # # closest point weight transfer from one (combined) source, reused for every target
+    """
+    def __init__(self, source, useScipy=True):
+        """
+        :param source: SourceSkin (see SourceSkin.combine)
+        :param useScipy: use cKDTree if scipy is installed
+        """
+        self.source = source
+        self.index = SpatialIndex(source.points, useScipy)
+        self.weights = source.weights.dense()
+
+        # triangles around each vertex, CSR layout
+        self.incidence = None
+        if source.triangles is not None:
+            vertices = source.triangles.ravel()
+            order = np.argsort(vertices, kind='mergesort')
+            self.incidence = order // 3
+            self.incidencePtr = np.zeros(len(source.points) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(vertices, minlength=len(source.points)), out=self.incidencePtr[1:])
+
+    @property
+    def influences(self):
+        return self.source.influences
+
+    def transfer(self, targetPoints, chunk=CHUNK):
+        """
+        #
+        # # weights of every target point
+        #
+        :param targetPoints: (m x 3) array
+        :param chunk: target points processed at once
+        :return: SkinWeights of the target, with the influences of the source
+        """
+        targetPoints = np.asarray(targetPoints, dtype=np.float64)
+        result = np.empty((len(targetPoints), self.weights.shape[1]), dtype=np.float64)
+
+        for start in range(0, len(targetPoints), chunk):
+            stop = start + chunk
+            result[start:stop] = self.interpolate(targetPoints[start:stop])
+
+        return SkinWeights(self.influences, result)
+
+    def update(self, state, targetPoints, tolerance=TOLERANCE, chunk=CHUNK):
+        """
+        #
+        # # incremental transfer: only the points that moved are transferred again
+        #
+        :param state: TransferState of the previous transfer, see TransferState.matches
+        :param targetPoints: (m x 3) array
+        :param tolerance: distance a point may move and keep its weights
+        :param chunk: target points processed at once
+        :return: (SkinWeights, new TransferState, amount of points transferred)
+        """
+        targetPoints = np.asarray(targetPoints, dtype=np.float64)
+        delta = targetPoints - state.points
+        moved = np.flatnonzero(np.einsum('ij,ij->i', delta, delta) > tolerance * tolerance)
+        if not len(moved):
+            return state.weights, state, 0
+
+        weights = state.weights.dense().copy()
+        points = state.points.copy()
+        for start in range(0, len(moved), chunk):
+            rows = moved[start:start + chunk]
+            weights[rows] = self.interpolate(targetPoints[rows])
+            points[rows] = targetPoints[rows]
+
+        result = SkinWeights(self.influences, weights)
+        return result, TransferState(self.source, points, result), len(moved)
+
+    def interpolate(self, targets, nearest=None):
+        """
+        #
+        # # weights of a block of target points
+        #
+        :param targets: (m x 3) array
+        :param nearest: nearest source vertex of each target, queried if None
+        :return: (m x influence) array
+        """
+        if nearest is None:
+            nearest = self.index.query(targets)[1]
+        if self.incidence is None:
+            return self.weights[nearest]
+
+        corners, bary = self.closestTriangles(targets, nearest)
+        w = self.weights
+        return (bary[:, 0, None] * w[corners[:, 0]] +
+                bary[:, 1, None] * w[corners[:, 1]] +
+                bary[:, 2, None] * w[corners[:, 2]])
+
+    def closestTriangles(self, targets, nearest):
+        """
+        #
+        # # closest triangle around the nearest vertex and barycentric coordinates
+        #
+        # The candidate triangles of a block are padded to the largest valence
+        # of the block: the targets are grouped by valence (powers of two), so
+        # one high valence vertex does not pad the others, and every group is
+        # cut in blocks of at most CHUNK candidates.
+        #
+        :return: ((m x 3) corner vertices, (m x 3) barycentric weights)
+        """
+        start = self.incidencePtr[nearest]
+        valence = self.incidencePtr[nearest + 1] - start
+
+        corners = np.empty((len(targets), 3), dtype=self.source.triangles.dtype)
+        bary = np.empty((len(targets), 3))
+        group = np.ceil(np.log2(np.maximum(valence, 1))).astype(int)
+        for g in np.unique(group):
+            rows = np.flatnonzero(group == g)
+            size = max(CHUNK >> g, 1)
+            for i in range(0, len(rows), size):
+                block = rows[i:i + size]
+                corners[block], bary[block] = self._closestTriangles(targets[block], nearest[block],
+                                                                     start[block], valence[block])
+        return corners, bary
+
+    def _closestTriangles(self, targets, nearest, start, valence):
+        width = max(int(valence.max()), 1)
+
+        # (m x width) candidate triangles, padded with the first one
+        slot = np.arange(width)[None, :]
+        valid = slot < valence[:, None]
+        candidates = self.incidence[np.minimum(start[:, None] + slot, len(self.incidence) - 1)]
+
+        tri = self.source.triangles[candidates]
+        p = self.source.points
+        a, b, c = p[tri[..., 0]], p[tri[..., 1]], p[tri[..., 2]]
+        bary = barycentric(targets[:, None, :], a, b, c)
+
+        closest = bary[..., 0, None] * a + bary[..., 1, None] * b + bary[..., 2, None] * c
+        dist = np.einsum('ijk,ijk->ij', closest - targets[:, None, :], closest - targets[:, None, :])
+        dist[~valid] = np.inf
+        best = np.argmin(dist, axis=1)
+
+        rows = np.arange(len(targets))
+        corners = tri[rows, best]
+        bary = bary[rows, best]
+
+        # vertices without triangles take the weights of the nearest vertex
+        lonely = valence == 0
+        if lonely.any():
+            corners[lonely] = nearest[lonely, None]
+            bary[lonely] = (1.0, 0.0, 0.0)
+
+        return corners, bary
+
+
+def transfer_many(source, targets, processes=None, useProcesses=True):
+    """
+    #
+    # # weights of several targets, computed in parallel
+    #
+    # With useProcesses, every worker of the process pool receives the source
+    # once (pool initializer) and builds its own spatial index, then only the
+    # target points go to the workers and the weight arrays come back. The
+    # workers are spawned, never forked: forking the multithreaded Maya
+    # process can deadlock them. Where spawn is not available (python 2
+    # outside windows) the pool is only used from the main thread. Meant for
+    # mayapy and batch jobs, the UI uses the thread pool.
+    # Otherwise a thread pool shares one index (numpy and cKDTree release the
+    # GIL in the heavy loops). Nothing here touches the scene.
+    #
+    :param source: SourceSkin
+    :param targets: list of (m x 3) point arrays
+    :param processes: amount of workers, cpu count by default
+    :param useProcesses: process pool instead of thread pool
+    :return: list of SkinWeights, in the order of targets
+    """
+    if not targets:
+        return []
+
+    processes = min(processes or multiprocessing.cpu_count(), len(targets))
+    if processes < 2:
+        transfer = ClosestPointTransfer(source)
+        return [transfer.transfer(points) for points in targets]
+
+    if useProcesses and _can_spawn():
+        _set_pool_executable()
+        context = multiprocessing.get_context('spawn') if hasattr(multiprocessing, 'get_context') else multiprocessing
+        pool = context.Pool(processes, initializer=_init_worker, initargs=(source,))
+        try:
+            results = pool.map(_transfer_worker, targets, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+        return [SkinWeights(source.influences, weights) for weights in results]
+
+    transfer = ClosestPointTransfer(source)
+    pool = ThreadPool(processes)
+    try:
+        return pool.map(transfer.transfer, targets, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _can_spawn():
+    """
+    # # process pools start fresh interpreters, or fork from the main thread
+    """
+    if hasattr(multiprocessing, 'get_context') or sys.platform == 'win32':
+        return True
+    return isinstance(threading.current_thread(), threading._MainThread)
+
+
+def _init_worker(source):
+    global _workerTransfer
+    _workerTransfer = ClosestPointTransfer(source)
+
+
+def _transfer_worker(points):
+    return _workerTransfer.transfer(points).weights
+
+
+def _set_pool_executable():
+    """
+    # # inside the Maya GUI the workers must be started with mayapy, not maya
+    """
+    executable = os.path.basename(sys.executable).lower()
+    location = os.environ.get('MAYA_LOCATION')
+    if location and executable.startswith('maya') and not executable.startswith('mayapy'):
+        name = 'mayapy.exe' if sys.platform == 'win32' else 'mayapy'
+        multiprocessing.set_executable(os.path.join(location, 'bin', name))
+
+
+def barycentric(p, a, b, c):
+    """
+    #
+    # # barycentric coordinates of p projected on the triangles abc, clamped
+    # # inside the triangle (negative coordinates zeroed and renormalized)
+    #
+    :return: array (..., 3)
+    """
+    v0 = b - a
+    v1 = c - a
+    v2 = p - a
+    d00 = np.einsum('...k,...k', v0, v0)
+    d01 = np.einsum('...k,...k', v0, v1)
+    d11 = np.einsum('...k,...k', v1, v1)
+    d20 = np.einsum('...k,...k', v2, v0)
+    d21 = np.einsum('...k,...k', v2, v1)
+
+    denom = d00 * d11 - d01 * d01
+    degenerate = np.abs(denom) < 1e-12
+    denom = np.where(degenerate, 1.0, denom)
+
+    v = (d11 * d20 - d01 * d21) / denom
+    w = (d00 * d21 - d01 * d20) / denom
+    bary = np.stack((1.0 - v - w, v, w), axis=-1)
+    bary[degenerate] = (1.0, 0.0, 0.0)
+
+    bary = np.maximum(bary, 0.0)
+    return bary / bary.sum(axis=-1)[..., None]
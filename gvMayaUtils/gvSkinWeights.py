@@ -0,0 +1,295 @@
+"""
+#
+# # Skin weights as NumPy arrays
+#
+# SkinWeights holds the influences of a skinCluster and its (vertex x influence)
+# weight matrix, dense or sparse (CSR). It is pure NumPy: gvSkinCluster moves
+# the whole matrix in and out of Maya in one call, every copy/transfer
+# operation works on these arrays.
+#
+"""
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# influences above which the sparse layout is considered
+SPARSE_INFLUENCES = 16
+# maximum fraction of non zero weights for the sparse layout
+SPARSE_DENSITY = 0.25
+# weights below this are dropped by prune_weights
+PRUNE_THRESHOLD = 0.001
+# vertices processed at once by prune_weights, bounds the temporary arrays
+PRUNE_CHUNK = 65536
+
+
+class SparseWeights(object):
+    """
+    # # (vertex x influence) matrix in CSR layout: for the vertex v, the weights
+    # # data[indptr[v]:indptr[v+1]] belong to the influences indices[indptr[v]:indptr[v+1]]
+    """
+    def __init__(self, indptr, indices, data, shape):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.shape = tuple(shape)
+
+    def __repr__(self):
+        return 'SparseWeights(%d x %d, %d weights)' % (self.shape[0], self.shape[1], len(self.data))
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    @classmethod
+    def fromDense(cls, dense, threshold=0.0):
+        """
+        :param dense: (vertex x influence) array
+        :param threshold: weights <= threshold are not stored
+        :return: SparseWeights
+        """
+        mask = dense > threshold
+        indptr = np.zeros(dense.shape[0] + 1, dtype=np.int64)
+        np.cumsum(mask.sum(axis=1), out=indptr[1:])
+        indices = np.nonzero(mask)[1].astype(np.int32)
+        return cls(indptr, indices, dense[mask], dense.shape)
+
+    def toarray(self):
+        dense = np.zeros(self.shape, dtype=np.float64)
+        dense[self.rowIndices(), self.indices] = self.data
+        return dense
+
+    def rowIndices(self):
+        """
+        # # vertex of every stored weight
+        """
+        return np.repeat(np.arange(self.shape[0]), np.diff(self.indptr))
+
+    def rows(self, start, stop):
+        """
+        # # dense weights of the vertices start..stop-1 only
+        """
+        begin, end = self.indptr[start], self.indptr[stop]
+        dense = np.zeros((stop - start, self.shape[1]), dtype=np.float64)
+        rows = np.repeat(np.arange(stop - start), np.diff(self.indptr[start:stop + 1]))
+        dense[rows, self.indices[begin:end]] = self.data[begin:end]
+        return dense
+
+
+class SkinWeights(object):
+    """
+    # # influences and weight matrix of one skinned mesh
+    """
+    def __init__(self, influences, weights):
+        """
+        :param influences: list of influence names (long names)
+        :param weights: (vertex x influence) ndarray or SparseWeights
+        """
+        require_numpy()
+        self.influences = list(influences)
+        self.weights = weights
+
+    def __repr__(self):
+        return 'SkinWeights(%d vertices, %d influences%s)' % (self.vertexCount, self.influenceCount,
+                                                              ', sparse' if self.isSparse else '')
+
+    @property
+    def vertexCount(self):
+        return self.weights.shape[0]
+
+    @property
+    def influenceCount(self):
+        return self.weights.shape[1]
+
+    @property
+    def isSparse(self):
+        return isinstance(self.weights, SparseWeights)
+
+    @classmethod
+    def fromFlat(cls, influences, flat, compact=True):
+        """
+        #
+        # # weights as returned by MFnSkinCluster.getWeights: vertex major, one
+        # # value per influence
+        #
+        :param influences: list of influence names
+        :param flat: sequence of vertexCount * len(influences) floats
+        :param compact: store sparse if the matrix is big and mostly empty
+        :return: SkinWeights
+        """
+        dense = np.asarray(flat, dtype=np.float64).reshape(-1, max(len(influences), 1))
+        weights = cls(influences, dense)
+        if compact:
+            weights.compact()
+        return weights
+
+    def dense(self):
+        """
+        :return: (vertex x influence) float64 ndarray
+        """
+        if self.isSparse:
+            return self.weights.toarray()
+        return self.weights
+
+    def flat(self):
+        """
+        # # weights in the layout of MFnSkinCluster.setWeights
+        """
+        return np.ascontiguousarray(self.dense(), dtype=np.float64).ravel()
+
+    def compact(self):
+        """
+        # # switch to the sparse layout if it pays off
+        :return: True if the weights are sparse
+        """
+        if not self.isSparse and self.influenceCount > SPARSE_INFLUENCES:
+            dense = self.weights
+            if np.count_nonzero(dense) <= SPARSE_DENSITY * dense.size:
+                self.weights = SparseWeights.fromDense(dense)
+        return self.isSparse
+
+    def usedInfluences(self, threshold=0.0):
+        """
+        :return: bool array, True for the influences with a weight > threshold on some vertex
+        """
+        if self.isSparse:
+            w = self.weights
+            used = np.zeros(self.influenceCount, dtype=bool)
+            used[w.indices[w.data > threshold]] = True
+            return used
+        return (self.weights > threshold).any(axis=0)
+
+    def pruneInfluences(self, threshold=0.0):
+        """
+        #
+        # # drop the influences whose weight is <= threshold on every vertex
+        #
+        # At least one influence is kept, a skinCluster needs one.
+        #
+        :return: SkinWeights, self if nothing is dropped
+        """
+        used = self.usedInfluences(threshold)
+        if used.all():
+            return self
+        if not used.any():
+            used[0] = True
+
+        keep = np.flatnonzero(used)
+        influences = [self.influences[i] for i in keep]
+        if not self.isSparse:
+            return SkinWeights(influences, self.weights[:, keep])
+
+        # renumber the stored columns, the dropped ones hold no weight above threshold
+        w = self.weights
+        lut = np.full(self.influenceCount, -1, dtype=np.int32)
+        lut[keep] = np.arange(len(keep), dtype=np.int32)
+        stored = lut[w.indices] >= 0
+        indptr = np.zeros_like(w.indptr)
+        np.cumsum(np.bincount(w.rowIndices()[stored], minlength=w.shape[0]), out=indptr[1:])
+        return SkinWeights(influences, SparseWeights(indptr, lut[w.indices[stored]], w.data[stored],
+                                                     (w.shape[0], len(keep))))
+
+    def copy(self):
+        if self.isSparse:
+            w = self.weights
+            return SkinWeights(self.influences, SparseWeights(w.indptr.copy(), w.indices.copy(), w.data.copy(), w.shape))
+        return SkinWeights(self.influences, self.weights.copy())
+
+
+def prune_weights(weights, threshold=PRUNE_THRESHOLD, maxInfluences=None, stats=None):
+    """
+    #
+    # # drop the small weights, cap the influences of every vertex and renormalize
+    #
+    # Weights below threshold are zeroed, then only the maxInfluences largest
+    # weights of each vertex are kept (argpartition over the rows), then every
+    # vertex is normalized to 1. A vertex that would lose all its weights
+    # keeps its largest one. Vectorized over blocks of PRUNE_CHUNK vertices.
+    #
+    :param weights: SkinWeights
+    :param threshold: smallest weight kept
+    :param maxInfluences: influences kept per vertex, no cap if None
+    :param stats: dict updated with 'before' / 'after' (non zero weights), 'removed',
+                  'meanBefore' / 'meanAfter' and 'maxBefore' / 'maxAfter' (influences per vertex)
+    :return: SkinWeights, sparse if it pays off
+    """
+    require_numpy()
+    vertexCount, influenceCount = weights.weights.shape
+    cap = maxInfluences if maxInfluences and maxInfluences < influenceCount else None
+
+    result = np.empty((vertexCount, influenceCount), dtype=np.float64)
+    countBefore = np.empty(vertexCount, dtype=np.int64)
+    for start in range(0, vertexCount, PRUNE_CHUNK):
+        stop = min(start + PRUNE_CHUNK, vertexCount)
+        if weights.isSparse:
+            w = weights.weights.rows(start, stop)
+        else:
+            w = np.array(weights.weights[start:stop], dtype=np.float64)
+        rows = np.arange(stop - start)
+
+        countBefore[start:stop] = np.count_nonzero(w, axis=1)
+        strongest = np.argmax(w, axis=1)
+        strongestWeight = w[rows, strongest]
+
+        w[w < threshold] = 0.0
+        if cap is not None:
+            dropped = np.argpartition(w, influenceCount - cap, axis=1)[:, :influenceCount - cap]
+            w[rows[:, None], dropped] = 0.0
+
+        total = w.sum(axis=1)
+        empty = total <= 0.0
+        if empty.any():
+            w[rows[empty], strongest[empty]] = strongestWeight[empty]
+            total[empty] = strongestWeight[empty]
+        total[total <= 0.0] = 1.0
+        result[start:stop] = w / total[:, None]
+
+    countAfter = np.count_nonzero(result, axis=1)
+    if stats is not None:
+        before, after = int(countBefore.sum()), int(countAfter.sum())
+        stats['before'] = before
+        stats['after'] = after
+        stats['removed'] = before - after
+        stats['meanBefore'] = float(before) / vertexCount if vertexCount else 0.0
+        stats['meanAfter'] = float(after) / vertexCount if vertexCount else 0.0
+        stats['maxBefore'] = int(countBefore.max()) if vertexCount else 0
+        stats['maxAfter'] = int(countAfter.max()) if vertexCount else 0
+
+    pruned = SkinWeights(weights.influences, result)
+    pruned.compact()
+    return pruned
+
+
+def union_influences(keyLists):
+    """
+    #
+    # # union of several influence lists and the column lookup tables
+    #
+    # Every influence appears once in the union, identified by its key (the
+    # node UUID, so two names of the same joint are not bound twice). The
+    # lookup table of a list gives the union column of each of its columns:
+    # union[:, luts[i]] = weights[i].
+    #
+    :param keyLists: list of lists of influence keys
+    :return: (union keys, list of int arrays)
+    """
+    require_numpy()
+    keys = []
+    column = {}
+    luts = []
+    for keyList in keyLists:
+        lut = np.empty(len(keyList), dtype=np.int64)
+        for i, key in enumerate(keyList):
+            if key not in column:
+                column[key] = len(keys)
+                keys.append(key)
+            lut[i] = column[key]
+        luts.append(lut)
+
+    return keys, luts
+
+
+def require_numpy():
+    if np is None:
+        raise RuntimeError('numpy is required for the skin weight engine')
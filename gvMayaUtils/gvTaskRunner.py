@@ -0,0 +1,222 @@
+"""
+#
+# # Long operations run in slices of the main thread
+#
+# A task is a generator. Between two yields it runs on the main thread (scene
+# reads and writes, in bounded batches), and it yields:
+#
+#   Progress(done, total, text)    progress of the task
+#   Background(function, *args)    function run on a worker thread, it must not
+#                                  touch the scene; the task gets its result
+#                                  back (or its exception raised at the yield)
+#   None                           a point where the task may be paused
+#
+# Generators of python 2 return no value: a task fills the list or dict it
+# receives instead. An undo chunk must never stay open across a yield: the
+# user keeps working in Maya between two slices, and their edits would be
+# recorded in the chunk of the task.
+#
+# run_task runs a task to the end right away (scripts, batch). TaskRunner runs
+# it from the Qt event loop: every slice advances the task for at most SLICE
+# seconds, then gives the event loop back with a 0 ms QTimer (after the pending
+# events, like maya.utils.executeDeferred), so Maya keeps redrawing, the
+# progress is shown and cancel() stops the task at its current yield. Closing
+# the generator runs its finally blocks (journals, rollbacks).
+#
+"""
+import logging
+import sys
+import threading
+from functools import partial
+from timeit import default_timer as timer
+
+try:
+    from Qt.QtCore import QTimer
+except ImportError:
+    QTimer = None
+
+
+logger = logging.getLogger('gvTaskRunner')
+
+# seconds a slice may keep the main thread
+SLICE = 0.05
+# milliseconds between two checks of a background function
+POLL = 20
+
+
+class Progress(object):
+    """
+    # # done of total steps, with a description of the current one
+    """
+    def __init__(self, done, total, text=''):
+        self.done = done
+        self.total = total
+        self.text = text
+
+
+class Background(object):
+    """
+    # # function call for a worker thread
+    """
+    def __init__(self, function, *args, **kwargs):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.result = None
+        self.error = None
+        self.finished = threading.Event()
+
+    def call(self):
+        return self.function(*self.args, **self.kwargs)
+
+    def start(self):
+        """
+        # # run the call on a daemon thread, see finished/result/error
+        """
+        thread = threading.Thread(target=self._run, name='gvTaskRunner')
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.result = self.call()
+        except Exception:
+            self.error = sys.exc_info()
+        self.finished.set()
+
+
+def run_task(task):
+    """
+    #
+    # # run a task to the end, the background functions called here
+    #
+    :param task: generator, see the module docstring
+    :return: None
+    """
+    value = error = None
+    while True:
+        try:
+            item = task.throw(*error) if error else task.send(value)
+        except StopIteration:
+            return
+        value = error = None
+
+        if isinstance(item, Background):
+            try:
+                value = item.call()
+            except Exception:
+                error = sys.exc_info()
+
+
+class TaskRunner(object):
+    """
+    #
+    # # runs one task at a time from the Qt event loop
+    #
+    # onProgress(name, done, total, text, eta) is called at every Progress,
+    # eta in seconds or None. onFinished(name, status, error) at the end,
+    # status 'done', 'cancelled' or 'failed'.
+    #
+    """
+    def __init__(self, onProgress=None, onFinished=None, slice=SLICE):
+        if QTimer is None:
+            raise RuntimeError('TaskRunner needs Qt')
+        self.onProgress = onProgress
+        self.onFinished = onFinished
+        self.slice = slice
+
+        self.name = None
+        self.task = None
+        self.pending = None
+        self.started = None
+        # a new id for every task, slices scheduled for an old task are ignored
+        self.generation = 0
+
+    @property
+    def running(self):
+        return self.task is not None
+
+    def start(self, task, name=''):
+        """
+        :param task: generator, see the module docstring
+        :param name: name given to the callbacks
+        """
+        if self.running:
+            raise RuntimeError('%s is still running' % self.name)
+
+        self.generation += 1
+        self.name = name
+        self.task = task
+        self.pending = None
+        self.started = timer()
+        self._schedule(0)
+
+    def cancel(self):
+        """
+        # # stop the task at its current yield, a background function still running is abandoned
+        """
+        if self.running:
+            self._finish('cancelled')
+
+    def _schedule(self, msec):
+        QTimer.singleShot(msec, partial(self._step, self.generation))
+
+    def _step(self, generation):
+        if generation != self.generation or not self.running:
+            return
+
+        value = error = None
+        if self.pending is not None:
+            if not self.pending.finished.is_set():
+                self._schedule(POLL)
+                return
+            value, error = self.pending.result, self.pending.error
+            self.pending = None
+
+        deadline = timer() + self.slice
+        try:
+            while True:
+                item = self.task.throw(*error) if error else self.task.send(value)
+                value = error = None
+
+                if isinstance(item, Background):
+                    self.pending = item.start()
+                    self._schedule(POLL)
+                    return
+                if isinstance(item, Progress):
+                    self._progress(item)
+                    # cancelled by the progress callback
+                    if generation != self.generation:
+                        return
+                if timer() >= deadline:
+                    self._schedule(0)
+                    return
+        except StopIteration:
+            self._finish('done')
+        except Exception as e:
+            logger.exception('%s failed' % self.name)
+            self._finish('failed', e)
+
+    def _progress(self, progress):
+        eta = None
+        if progress.done and progress.total:
+            elapsed = timer() - self.started
+            eta = elapsed * (progress.total - progress.done) / float(progress.done)
+        if self.onProgress is not None:
+            self.onProgress(self.name, progress.done, progress.total, progress.text, eta)
+
+    def _finish(self, status, error=None):
+        task, name = self.task, self.name
+        self.task = None
+        self.pending = None
+        self.generation += 1
+
+        if status == 'cancelled':
+            try:
+                task.close()
+            except Exception as e:
+                logger.exception('%s failed to stop' % name)
+                status, error = 'failed', e
+        if self.onFinished is not None:
+            self.onFinished(name, status, error)
@@ -0,0 +1,112 @@
+"""
+#
+# # One undo step for edits done in several batches
+#
+# The edits (renames, plug values) are queued in one OpenMaya MDGModifier and
+# done batch by batch: every doIt only runs the operations queued since the
+# last one. commit() then puts the whole modifier in the undo queue as a
+# single step, through the gvModifier command of the gvUndoPlugin plugin,
+# whose undoIt/redoIt call the undoIt/doIt of the modifier. No undo chunk
+# stays open between two batches, so the user can keep working in Maya while
+# a gvTaskRunner task runs, and one Ctrl+Z still undoes the whole task.
+#
+"""
+import os
+
+import maya.cmds as cmds
+
+try:
+    import maya.api.OpenMaya as om
+except ImportError:
+    om = None
+
+
+COMMAND = 'gvModifier'
+PLUGIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gvUndoPlugin.py')
+
+# modifier handed to the next gvModifier call
+_pending = []
+
+
+def available():
+    """
+    :return: True if the modifiers and the gvModifier command can be used
+    """
+    return om is not None and hasattr(om, 'MDGModifier') and hasattr(om, 'MPxCommand')
+
+
+def command_class():
+    """
+    # # the gvModifier command, registered by gvUndoPlugin
+    """
+    class ModifierCommand(om.MPxCommand):
+
+        def __init__(self):
+            om.MPxCommand.__init__(self)
+            self.modifier = None
+
+        def doIt(self, args):
+            # the edits are already done, the command only keeps the modifier
+            self.modifier = _pending.pop()
+
+        def redoIt(self):
+            self.modifier.doIt()
+
+        def undoIt(self):
+            self.modifier.undoIt()
+
+        def isUndoable(self):
+            return True
+
+    return ModifierCommand
+
+
+def load():
+    if not cmds.pluginInfo(PLUGIN, query=True, loaded=True):
+        cmds.loadPlugin(PLUGIN, quiet=True)
+
+
+def modifier():
+    return om.MDGModifier()
+
+
+def dependency_nodes(names):
+    """
+    #
+    # # MObjects of the nodes, one MSelectionList for all of them
+    #
+    # The MObjects stay valid when the nodes (or their parents) are renamed.
+    #
+    :param names: list of unique node names
+    :return: list of MObject, in the order of names
+    """
+    selection = om.MSelectionList()
+    for name in names:
+        selection.add(name)
+    if selection.length() != len(names):
+        raise RuntimeError('%d nodes for %d names' % (selection.length(), len(names)))
+    return [selection.getDependNode(i) for i in range(selection.length())]
+
+
+def node_name(node):
+    return om.MFnDependencyNode(node).name()
+
+
+def find_plug(node, attribute):
+    return om.MFnDependencyNode(node).findPlug(attribute, False)
+
+
+def commit(modifier):
+    """
+    #
+    # # put a modifier, already done, in the undo queue as one step
+    #
+    :param modifier: MDGModifier
+    :return: None
+    """
+    load()
+    _pending.append(modifier)
+    try:
+        getattr(cmds, COMMAND)()
+    finally:
+        del _pending[:]
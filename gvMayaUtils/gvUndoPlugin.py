@@ -0,0 +1,28 @@
+"""
+#
+# # Maya plugin of the gvModifier command, loaded by gvUndo.load
+#
+"""
+import sys
+
+
+def maya_useNewAPI():
+    pass
+
+
+def _gvUndo():
+    # the gvUndo module of the tools, whatever the name it was imported with
+    module = sys.modules.get('gvMayaUtils.gvUndo') or sys.modules.get('gvUndo')
+    if module is None:
+        from gvMayaUtils import gvUndo as module
+    return module
+
+
+def initializePlugin(plugin):
+    gvUndo = _gvUndo()
+    gvUndo.om.MFnPlugin(plugin, 'gvRigTools', '1.0').registerCommand(gvUndo.COMMAND, gvUndo.command_class())
+
+
+def uninitializePlugin(plugin):
+    gvUndo = _gvUndo()
+    gvUndo.om.MFnPlugin(plugin).deregisterCommand(gvUndo.COMMAND)
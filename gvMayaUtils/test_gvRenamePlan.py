@@ -0,0 +1,99 @@
+"""
+#
+# # Tests of the rename planner, no maya needed
+#
+#     cd gvMayaUtils && python -m pytest test_gvRenamePlan.py
+#     cd gvMayaUtils && python -m unittest test_gvRenamePlan
+#
+"""
+import unittest
+
+from gvRenamePlan import NameIndex, RenamePlan, build_plan, find_conflicts, plan_names, resolve_conflicts
+
+
+class BuildPlanTest(unittest.TestCase):
+
+    def test_deepest_first(self):
+        plan = build_plan(['|grp', '|grp|ctrl', '|grp|ctrl|shape', '|other'], ['a', 'b', 'c', 'd'])
+        self.assertEqual(plan.oldNames(), ['|grp|ctrl|shape', '|grp|ctrl', '|grp', '|other'])
+        self.assertEqual(plan.mapping()['|grp'], 'a')
+
+    def test_siblings_keep_their_order(self):
+        plan = build_plan(['|g|b', '|g|a', '|g|c'], ['x', 'y', 'z'])
+        self.assertEqual(plan.entries, [('|g|b', 'x'), ('|g|a', 'y'), ('|g|c', 'z')])
+
+    def test_selection_order(self):
+        plan = build_plan(['|grp', '|grp|ctrl'], ['a', 'b'], deepestFirst=False)
+        self.assertEqual(plan.oldNames(), ['|grp', '|grp|ctrl'])
+
+    def test_missing_names(self):
+        self.assertRaises(ValueError, build_plan, ['|a', '|b'], ['x'])
+
+
+class ConflictTest(unittest.TestCase):
+
+    def test_unique_name(self):
+        index = NameIndex(['|ctrl', '|ctrl1', '|grp|ctrl2', 'arm9'])
+        self.assertEqual(index.unique_name('free'), 'free')
+        self.assertEqual(index.unique_name('ctrl'), 'ctrl3')
+        self.assertEqual(index.unique_name('arm9'), 'arm10')
+
+    def test_scene_conflict(self):
+        plan = RenamePlan([('|b', 'x1'), ('|c', 'x2')])
+        resolved, conflicts = resolve_conflicts(plan, NameIndex(['|b', '|c', '|x1']))
+        self.assertEqual(resolved.entries, [('|b', 'x2'), ('|c', 'x3')])
+        self.assertEqual(conflicts, [('|b', 'x1'), ('|c', 'x2')])
+
+    def test_conflict_inside_the_plan(self):
+        plan = RenamePlan([('|b', 'y'), ('|c', 'y')])
+        resolved, conflicts = resolve_conflicts(plan, NameIndex(['|b', '|c']))
+        self.assertEqual(resolved.newNames(), ['y', 'y1'])
+        self.assertEqual(conflicts, [('|c', 'y')])
+
+    def test_freed_names(self):
+        # b frees its name before c asks for it
+        plan = RenamePlan([('|b', 'a'), ('|c', 'b')])
+        resolved, conflicts = find_conflicts(plan, NameIndex(['|b', '|c']))
+        self.assertEqual(conflicts, [])
+        self.assertEqual(resolved.entries, plan.entries)
+
+    def test_unchanged_names(self):
+        plan = RenamePlan([('|a', 'a')])
+        self.assertEqual(find_conflicts(plan, NameIndex(['|a']))[1], [])
+
+    def test_index_not_modified(self):
+        index = NameIndex(['|b'])
+        find_conflicts(RenamePlan([('|b', 'x')]), index, resolve=True)
+        self.assertTrue('b' in index)
+        self.assertFalse('x' in index)
+
+
+class PlanNamesTest(unittest.TestCase):
+
+    def test_numeric(self):
+        self.assertEqual(plan_names('x#', 3), ['x1', 'x2', 'x3'])
+
+    def test_alphabetical(self):
+        self.assertEqual(plan_names('x@@', 3), ['xAA', 'xAB', 'xAC'])
+
+    def test_str_then_num(self):
+        self.assertEqual(plan_names('arm_<str:1>_<num:2>', 7),
+                         ['arm_A_01', 'arm_A_02', 'arm_A_03', 'arm_B_01', 'arm_B_02', 'arm_B_03', 'arm_C_01'])
+
+    def test_num_then_str(self):
+        self.assertEqual(plan_names('arm_<num:2>_<str:1>', 4), ['arm_01_A', 'arm_02_A', 'arm_03_A', 'arm_01_B'])
+
+    def test_num_frequency(self):
+        self.assertEqual(plan_names('<str:1><num:1>', 3, numFrequency=2), ['A1', 'A2', 'B1'])
+
+    def test_tokens(self):
+        contexts = [{'name': 'a', 'parent': '', 'type': 'joint', 'side': 'L'},
+                    {'name': 'b', 'parent': '', 'type': 'joint', 'side': 'R'}]
+        self.assertEqual(plan_names('{side}_{type}_#', 2, contexts=contexts), ['L_joint_1', 'R_joint_2'])
+
+    def test_no_field(self):
+        self.assertEqual(plan_names('fixed', 2), [])
+
+
+if __name__ == '__main__':
+    unittest.main()